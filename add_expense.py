@@ -5,28 +5,15 @@ import os
 from datetime import datetime, timedelta, date
 import plotly.express as px
 import matplotlib.pyplot as plt
-from pandas.errors import EmptyDataError
+from core import load_ledger, append_transactions, delete_transactions, update_transaction, query_date_range, query_date_range_page, count_date_range, get_period_bounds
+from core import importer, validate_entry, create_backup, list_backups, restore_backup, ConflictError
+from config import IMPORT_PREVIEW_ROWS, TRANSACTIONS_PAGE_SIZES, DEFAULT_CATEGORIES
 
 
 st.title("💸 Add Expense or Income")
 
-# ----------- CSV Load or Create-----------------
-csv_file = os.path.join("data", "add_expense.csv")
-os.makedirs("data", exist_ok=True)  # Ensure folder exists
-
-# Load data from CSV or create a new DataFrame
-def load_data():
-    try:
-        return pd.read_csv(csv_file, parse_dates=["Date"])
-    except (FileNotFoundError, EmptyDataError):
-        return pd.DataFrame(columns=["Date", "Type", "Amount", "Category", "Description"])
-
-def save_data(df):
-    df.to_csv(csv_file, index=False)
-
-df_data = load_data()
-# df_data["Date"] = pd.to_datetime(df_data["Date"])  # ✅ Fix type
-df_data["Date"] = pd.to_datetime(df_data["Date"], format='mixed')
+# ----------- Ledger Load -----------------
+df_data = load_ledger()
 
 
 tab1, tab2, tab3 = st.tabs(["➕ Add Entry", "📄 Transactions", "📁 Import/Export"])
@@ -48,20 +35,22 @@ with tab1:
         submitted = st.form_submit_button("💾 Save Entry")
 
         if submitted:
-            new_entry = pd.DataFrame([{
-                "Date": pd.to_datetime(date).date(),
+            append_transactions([{
+                "Date": date,
                 "Type": entry_type,
                 "Category": category,
                 "Amount": amount,
                 "Description": description
             }])
-            df_data = pd.concat([df_data, new_entry], ignore_index=True)
-            save_data(df_data)
+            df_data = load_ledger()
             st.success("Entry saved successfully!")
 
 with tab2:
     # st.subheader("📌 Recent Transactions")
     
+    if st.session_state.pop("edit_conflict", False):
+        st.error("⚠️ That transaction was changed or deleted in another session. The latest transactions are shown; please try again.")
+
     if df_data.empty:
         st.info("No transactions yet. Start by adding one above.")
     else:
@@ -75,19 +64,9 @@ with tab2:
 
         today = datetime.now()
 
-        if filter_option == "This Week":
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-
-        elif filter_option == "This Month":
-            start_date = today.replace(day=1)
-            end_date = today
-
-        elif filter_option == "This Year":
-            start_date = today.replace(month=1, day=1)
-            end_date = today
-
-        elif filter_option == "Custom Range":
+        if filter_option != "Custom Range":
+            start_date, end_date = get_period_bounds(filter_option, today)
+        else:
             col1, col2 = st.columns(2)
             with col1:
                 start_date = st.date_input("From", value=today.replace(day=1))
@@ -97,44 +76,107 @@ with tab2:
         if start_date > end_date:
             st.error("⚠️ Start date cannot be after end date.")
         else:
-            # Normalize comparisons to date-only to avoid Timestamp vs date issues
-            start_cmp = pd.to_datetime(start_date).date()
-            end_cmp = pd.to_datetime(end_date).date()
-            date_series = pd.to_datetime(df_data["Date"], errors="coerce").dt.date
+            # --- Sort & Page Options ---
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                sort_order = st.selectbox(
+                    "Sort by",
+                    ["Newest first", "Oldest first", "Largest amount", "Smallest amount"]
+                )
+            with col2:
+                page_size = st.selectbox("Rows per page", TRANSACTIONS_PAGE_SIZES)
 
-            mask = (date_series >= start_cmp) & (date_series <= end_cmp)
-            filtered_data = df_data.loc[mask].sort_values(by="Date", ascending=False)
+            sort_by = "Amount" if "amount" in sort_order else "Date"
+            descending = sort_order in ("Newest first", "Largest amount")
 
-            if filtered_data.empty:
+            total_rows = count_date_range(start_date, end_date)
+            page_count = max(1, -(-total_rows // page_size))
+            with col3:
+                page_number = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+
+            if total_rows == 0:
                 st.info(f"No transactions from {start_date} to {end_date}")
             else:
+                # Only the visible page is taken from the ledger
+                page_data, _ = query_date_range_page(
+                    start_date, end_date, page=page_number - 1, page_size=page_size,
+                    sort_by=sort_by, descending=descending
+                )
+                first_row = (page_number - 1) * page_size + 1
+                st.caption(f"Showing {first_row}–{first_row + len(page_data) - 1} of {total_rows} transactions")
+
                 # Convert datetime to date only and hide index
-                display_data = filtered_data.copy()
+                display_data = page_data.copy()
                 display_data["Date"] = display_data["Date"].dt.date
                 # Simple inline edit/delete controls
                 st.dataframe(display_data, use_container_width=True, hide_index=True)
 
-                # Inline delete by selecting an index from filtered view
-                delete_idx = st.selectbox("Select a row to delete (by index)", options=filtered_data.index.tolist(), format_func=lambda i: f"{filtered_data.loc[i, 'Date'].date()} | {filtered_data.loc[i, 'Category']} | ₹{filtered_data.loc[i, 'Amount']}" if 'Date' in filtered_data.columns else str(i))
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    if st.button("🗑️ Delete Selected"):
-                        df_data.drop(index=delete_idx, inplace=True)
-                        df_data.reset_index(drop=True, inplace=True)
-                        save_data(df_data)
-                        st.success("✅ Deleted successfully!")
-                        st.rerun()
-                with col_b:
-                    st.caption("Edit coming soon (amount/category/date)")
+                # Inline edit/delete by selecting a transaction (by ID) from the visible page
+                row_labels = {
+                    txn_id: f"#{txn_id} | {day} | {category} | ₹{amount}"
+                    for txn_id, day, category, amount in zip(
+                        page_data["ID"], display_data["Date"], page_data["Category"], page_data["Amount"]
+                    )
+                }
+                selected_id = st.selectbox("Select a transaction", options=list(row_labels), format_func=row_labels.get)
+                selected = page_data[page_data["ID"] == selected_id].iloc[0]
 
-                # Download button
-                csv = filtered_data.to_csv(index=False).encode('utf-8')
-                st.download_button(
-                    label="📥 Download Filtered Transactions (CSV)",
-                    data=csv,
-                    file_name=f"transactions_{start_date}_to_{end_date}.csv",
-                    mime='text/csv'
-                )
+                with st.expander("✏️ Edit Selected"):
+                    with st.form(f"edit_form_{selected_id}"):
+                        type_options = ["Income", "Expense"]
+                        if selected["Type"] not in type_options:
+                            type_options.append(selected["Type"])
+                        category_options = list(DEFAULT_CATEGORIES)
+                        current_category = selected["Category"] if pd.notna(selected["Category"]) else category_options[-1]
+                        if current_category not in category_options:
+                            category_options.append(current_category)
+
+                        col1, col2 = st.columns(2)
+                        edit_type = col1.selectbox("Type", type_options, index=type_options.index(selected["Type"]))
+                        edit_category = col2.selectbox("Category", category_options, index=category_options.index(current_category))
+
+                        col3, col4 = st.columns(2)
+                        edit_amount = col3.number_input("Amount (₹)", min_value=0.0, value=float(selected["Amount"]), format="%.2f")
+                        edit_date = col4.date_input("Date", value=selected["Date"].date())
+                        edit_description = st.text_input(
+                            "Description (optional)",
+                            value="" if pd.isna(selected["Description"]) else selected["Description"]
+                        )
+
+                        if st.form_submit_button("💾 Save Changes"):
+                            errors = validate_entry(edit_amount, edit_category, edit_description)
+                            if errors:
+                                for error in errors:
+                                    st.error(error)
+                            else:
+                                try:
+                                    update_transaction(selected_id, {
+                                        "Date": edit_date,
+                                        "Type": edit_type,
+                                        "Category": edit_category,
+                                        "Amount": edit_amount,
+                                        "Description": edit_description
+                                    })
+                                    st.success("✅ Updated successfully!")
+                                except (KeyError, ConflictError):
+                                    st.session_state["edit_conflict"] = True
+                                st.rerun()
+
+                if st.button("🗑️ Delete Selected"):
+                    delete_transactions([selected_id])
+                    st.success("✅ Deleted successfully!")
+                    st.rerun()
+
+                # The full range is only materialized when an export is requested
+                if st.button("📄 Prepare CSV of all filtered transactions"):
+                    filtered_data = query_date_range(start_date, end_date, descending=descending)
+                    csv = filtered_data.to_csv(index=False).encode('utf-8')
+                    st.download_button(
+                        label="📥 Download Filtered Transactions (CSV)",
+                        data=csv,
+                        file_name=f"transactions_{start_date}_to_{end_date}.csv",
+                        mime='text/csv'
+                    )
 
 # --------------- TAB 3: Import/Export ----------------
 with tab3:
@@ -185,122 +227,82 @@ with tab3:
         
         if uploaded_file is not None:
             try:
-                # Read uploaded file
-                uploaded_df = pd.read_csv(uploaded_file)
+                # Only the first rows are read for the preview; the import streams the rest
+                preview_df = pd.read_csv(uploaded_file, nrows=IMPORT_PREVIEW_ROWS)
+                uploaded_file.seek(0)
                 
                 # Validate required columns
-                required_columns = ["Date", "Type", "Category", "Amount"]
-                missing_columns = [col for col in required_columns if col not in uploaded_df.columns]
+                missing_columns = importer.missing_columns(preview_df.columns)
                 
                 if missing_columns:
                     st.error(f"❌ Missing required columns: {', '.join(missing_columns)}")
                     st.error("Please ensure your CSV has: Date, Type, Category, Amount columns")
                 else:
                     # Show preview of uploaded data
-                    st.markdown("### 📋 Preview of Uploaded Data")
+                    st.markdown(f"### 📋 Preview of Uploaded Data (first {IMPORT_PREVIEW_ROWS} rows)")
                     
                     # Convert date column to datetime for display
-                    display_df = uploaded_df.copy()
-                    if "Date" in display_df.columns:
-                        display_df["Date"] = pd.to_datetime(display_df["Date"], errors="coerce")
-                        display_df["Date"] = display_df["Date"].dt.date
-                    
-                    st.dataframe(display_df, use_container_width=True, hide_index=True)
+                    preview_df["Date"] = pd.to_datetime(preview_df["Date"], format="mixed", errors="coerce").dt.date
+                    st.dataframe(preview_df, use_container_width=True, hide_index=True)
                     
                     # Show summary
-                    total_rows = len(uploaded_df)
-                    total_amount = uploaded_df["Amount"].sum()
-                    income_count = len(uploaded_df[uploaded_df["Type"] == "Income"])
-                    expense_count = len(uploaded_df[uploaded_df["Type"] == "Expense"])
+                    upload_summary = importer.summarize_csv(uploaded_file)
+                    uploaded_file.seek(0)
                     
                     st.markdown("### 📊 Upload Summary")
                     col1, col2, col3, col4 = st.columns(4)
-                    col1.metric("Total Records", total_rows)
-                    col2.metric("Total Amount", f"₹ {total_amount:,.2f}")
-                    col3.metric("Income Records", income_count)
-                    col4.metric("Expense Records", expense_count)
+                    col1.metric("Total Records", upload_summary["rows"])
+                    col2.metric("Total Amount", f"₹ {upload_summary['amount']:,.2f}")
+                    col3.metric("Income Records", upload_summary["income"])
+                    col4.metric("Expense Records", upload_summary["expense"])
                     
                     # Merge button
                     if st.button("🔄 Merge with Existing Data", type="primary"):
                         try:
-                            # Validate and clean data
-                            cleaned_df = uploaded_df.copy()
-                            
-                            # Convert date to datetime
-                            cleaned_df["Date"] = pd.to_datetime(cleaned_df["Date"], errors="coerce")
-                            
-                            # Remove rows with invalid dates
-                            invalid_dates = cleaned_df["Date"].isna().sum()
-                            if invalid_dates > 0:
-                                st.warning(f"⚠️ {invalid_dates} rows with invalid dates will be skipped")
-                                cleaned_df = cleaned_df.dropna(subset=["Date"])
-                            
-                            # Validate amounts
-                            cleaned_df["Amount"] = pd.to_numeric(cleaned_df["Amount"], errors="coerce")
-                            invalid_amounts = cleaned_df["Amount"].isna().sum()
-                            if invalid_amounts > 0:
-                                st.warning(f"⚠️ {invalid_amounts} rows with invalid amounts will be skipped")
-                                cleaned_df = cleaned_df.dropna(subset=["Amount"])
-                            
-                            # Remove zero amounts
-                            zero_amounts = len(cleaned_df[cleaned_df["Amount"] == 0])
-                            if zero_amounts > 0:
-                                st.warning(f"⚠️ {zero_amounts} rows with zero amounts will be skipped")
-                                cleaned_df = cleaned_df[cleaned_df["Amount"] != 0]
+                            prev_count = len(load_ledger())
+                            progress_bar = st.progress(0.0, text="Importing...")
                             
-                            # Validate types
-                            valid_types = ["Income", "Expense"]
-                            invalid_types = cleaned_df[~cleaned_df["Type"].isin(valid_types)]
-                            if len(invalid_types) > 0:
-                                st.warning(f"⚠️ {len(invalid_types)} rows with invalid types will be skipped")
-                                cleaned_df = cleaned_df[cleaned_df["Type"].isin(valid_types)]
+                            def show_progress(report):
+                                done = report["rows_read"] / max(upload_summary["rows"], 1)
+                                progress_bar.progress(min(done, 1.0), text=f"Imported {report['imported']:,} of {report['rows_read']:,} rows read")
                             
-                            # Clean categories (remove empty ones)
-                            cleaned_df = cleaned_df.dropna(subset=["Category"])
-                            cleaned_df = cleaned_df[cleaned_df["Category"] != ""]
+                            # Validate, clean and commit the upload chunk by chunk
+                            report = importer.import_csv(uploaded_file, progress=show_progress)
                             
-                            # Ensure description column exists
-                            if "Description" not in cleaned_df.columns:
-                                cleaned_df["Description"] = ""
+                            skipped = {
+                                "invalid_dates": "rows with invalid dates were skipped",
+                                "invalid_amounts": "rows with invalid amounts were skipped",
+                                "zero_amounts": "rows with zero amounts were skipped",
+                                "invalid_types": "rows with invalid types were skipped",
+                                "empty_categories": "rows with empty categories were skipped",
+                            }
+                            for key, message in skipped.items():
+                                if report[key] > 0:
+                                    st.warning(f"⚠️ {report[key]} {message}")
                             
-                            # Merge with existing data
-                            if not cleaned_df.empty:
-                                # Convert date to date only for consistency
-                                cleaned_df["Date"] = cleaned_df["Date"].dt.date
+                            if report["imported"] > 0 or report["duplicates"] > 0:
+                                if report["duplicates"] > 0:
+                                    st.info(f"ℹ️ {report['duplicates']} duplicate records were automatically removed")
+                                    with st.expander("Show skipped duplicates"):
+                                        duplicates_df = pd.DataFrame(report["duplicate_rows"])
+                                        duplicates_df["Date"] = duplicates_df["Date"].dt.date
+                                        st.dataframe(duplicates_df[["Line", "Date", "Type", "Category", "Amount", "Description"]], use_container_width=True, hide_index=True)
+                                        if report["duplicates"] > len(duplicates_df):
+                                            st.caption(f"Showing the first {len(duplicates_df)} of {report['duplicates']} duplicates")
                                 
-                                # Merge with existing data
-                                prev_count = len(df_data)
-                                merged_df = pd.concat([df_data, cleaned_df], ignore_index=True)
+                                verified_df = load_ledger()
                                 
-                                # Remove duplicates based on all columns
-                                initial_count = len(merged_df)
-                                merged_df = merged_df.drop_duplicates()
-                                duplicates_removed = initial_count - len(merged_df)
-                                
-                                if duplicates_removed > 0:
-                                    st.info(f"ℹ️ {duplicates_removed} duplicate records were automatically removed")
-                                
-                                # Save merged data
-                                save_data(merged_df)
-
-                                # Verify by reloading from disk
-                                try:
-                                    verified_df = load_data()
-                                except Exception:
-                                    verified_df = merged_df
-
                                 # Show success message and details
-                                st.success(f"✅ Successfully merged {len(cleaned_df)} valid records!")
-                                st.info(f"ℹ️ Duplicates removed: {duplicates_removed}")
+                                st.success(f"✅ Successfully merged {report['imported']} valid records!")
+                                st.info(f"ℹ️ Duplicates removed: {report['duplicates']}")
                                 st.success(f"📊 Total records before: {prev_count} → after: {len(verified_df)}")
-
+                                
                                 # Show a preview of merged data
                                 st.markdown("### 📄 Merged Data Preview (latest 20)")
-                                preview_df = verified_df.copy()
-                                preview_df["Date"] = pd.to_datetime(preview_df["Date"], errors="coerce").dt.date
-                                preview_df = preview_df.sort_values("Date", ascending=False).head(20)
+                                preview_df = verified_df.nlargest(20, "Date").copy()
+                                preview_df["Date"] = preview_df["Date"].dt.date
                                 st.dataframe(preview_df, use_container_width=True, hide_index=True)
-
+                                
                                 # Optional: refresh page so other tabs pick up new data
                                 if st.button("🔄 Refresh page to load latest data"):
                                     st.rerun()
@@ -315,6 +317,31 @@ with tab3:
                 st.error(f"❌ Error reading file: {str(e)}")
                 st.error("Please ensure you're uploading a valid CSV file")
     
+    # Backups
+    st.markdown("---")
+    st.markdown("### 🗄️ Backups")
+    st.markdown("Backups only store what changed since the previous one, so you can take them often.")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("💾 Create Backup"):
+            snapshot_id = create_backup()
+            st.success(f"✅ Backup saved: {snapshot_id}")
+    with col2:
+        backups = list_backups()
+        if backups:
+            backup_labels = {
+                b["id"]: f"{b['created'].replace('T', ' ')} ({len(b['files'])} files, {b['size'] / 1024:,.0f} KB)"
+                for b in backups
+            }
+            restore_id = st.selectbox("Backup to restore", options=list(backup_labels), format_func=backup_labels.get)
+            confirm_restore = st.checkbox("Replace current data with this backup")
+            if st.button("♻️ Restore Backup", disabled=not confirm_restore):
+                restore_backup(restore_id)
+                st.success("✅ Backup restored!")
+                st.rerun()
+        else:
+            st.info("No backups yet.")
+
     # Additional help
     st.markdown("---")
     st.markdown("### 💡 Tips for CSV Import")
@@ -0,0 +1,6 @@
+"""Benchmarks for the data layer behind the Streamlit pages.
+
+Generate synthetic ledgers and time the computations each page performs:
+
+    python -m benchmarks.run --sizes 10000 100000 1000000 --output results.json
+"""
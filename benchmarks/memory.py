@@ -0,0 +1,81 @@
+"""Measure what the compact ledger adds to the ledger cache in memory and group-by speed.
+
+The cache keeps the compact ledger alongside the display frame rather than in
+place of it, so caching it grows memory by ``compact_bytes``; what it buys is
+faster aggregation.
+
+Usage:
+    python -m benchmarks.memory [--sizes N ...] [--output FILE]
+"""
+import argparse
+import json
+import sys
+import time
+import pandas as pd
+
+from core.compact import CompactLedger, EXPENSE
+from benchmarks.synthetic import generate_ledger
+from benchmarks.run import DEFAULT_SIZES
+
+
+def _best_of(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure(rows):
+    """Cached memory (frame alone and frame plus compact) and group-by timings for one ledger size"""
+    # Round-trip through CSV text so the frame has the dtypes the app loads
+    df = generate_ledger(rows)
+    df = df.assign(
+        Date=pd.to_datetime(df["Date"].dt.strftime("%Y-%m-%d")),
+        Type=df["Type"].astype(object),
+        Category=df["Category"].astype(object),
+        Description=df["Description"].replace("", None).astype(object),
+    )
+    compact = CompactLedger.from_frame(df)
+
+    frame_bytes = int(df.memory_usage(deep=True, index=False).sum())
+    compact_bytes = compact.memory_usage()
+    frame_groupby = _best_of(lambda: df[df["Type"] == "Expense"].groupby("Category")["Amount"].sum())
+    compact_groupby = _best_of(lambda: compact.category_stats(compact.mask(EXPENSE)))
+    return {
+        "rows": rows,
+        "frame_bytes": frame_bytes,
+        "compact_bytes": compact_bytes,
+        "cached_bytes": frame_bytes + compact_bytes,
+        "growth": (frame_bytes + compact_bytes) / frame_bytes,
+        "frame_category_groupby_s": frame_groupby,
+        "compact_category_groupby_s": compact_groupby,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.sizes:
+        result = measure(rows)
+        results.append(result)
+        print(f"{rows:>10,} frame {result['frame_bytes'] / 2**20:8.1f} MiB  "
+              f"+ compact {result['compact_bytes'] / 2**20:8.1f} MiB  "
+              f"= cached {result['cached_bytes'] / 2**20:8.1f} MiB  "
+              f"({(result['growth'] - 1) * 100:.0f}% more than the frame alone)", file=sys.stderr)
+
+    payload = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
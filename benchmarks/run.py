@@ -0,0 +1,205 @@
+"""Time the page computations on synthetic ledgers and emit JSON results.
+
+Usage:
+    python -m benchmarks.run [--sizes N ...] [--repeat R] [--output FILE]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from core import ledger, importer, backup
+from core.aggregates import MonthlyCube
+from core.storage import CsvBackend, PartitionedBackend, migrate_storage, pyarrow
+from core.analytics import (
+    get_monthly_summary, get_total_balance, get_top_spending_category, get_budget_tracking,
+    get_budget_recommendations, get_average_daily_spending, get_monthly_savings_rate
+)
+from core.goals import forecast_goals
+from benchmarks.synthetic import generate_ledger, generate_goals, generate_budgets, write_ledger_csv
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+IMPORT_SHARE = 0.1  # Upload size relative to the ledger for the import benchmark
+
+
+def _time(func, repeat):
+    """Run ``func`` ``repeat`` times and return the timings in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _make_backend(workdir, rows):
+    backend = CsvBackend(
+        expense_file=os.path.join(workdir, "add_expense.csv"),
+        goals_file=os.path.join(workdir, "financial_goals.csv"),
+        budgets_file=os.path.join(workdir, "budgets.csv"),
+        hash_index_file=os.path.join(workdir, "ledger_hashes.bin"),
+        changes_file=os.path.join(workdir, "ledger_changes.csv"),
+    )
+    backend.save_transactions(generate_ledger(rows))
+    backend.save_goals(generate_goals(max(10, rows // 1000)))
+    backend.save_budgets(generate_budgets())
+    return backend
+
+
+def benchmark_size(rows, repeat, workdir):
+    """Return {operation: [seconds, ...]} for one ledger size"""
+    backend = _make_backend(workdir, rows)
+    budgets = backend.load_budgets()
+    df = ledger.load_ledger(backend)
+    latest = df["Date"].max()
+    year, month = latest.year, latest.month
+
+    def cold_load():
+        ledger.invalidate(backend)
+        ledger.load_ledger(backend)
+
+    def cube_build():
+        MonthlyCube.from_ledger(ledger.load_ledger(backend))
+
+    def monthly_cards():
+        cube = ledger.get_monthly_cube(backend)
+        return [cube.summary(year, m) for m in range(1, 13)]
+
+    def trailing_windows():
+        for days in (7, 30, 90, 365):
+            get_average_daily_spending(days, backend=backend)
+
+    def report_charts():
+        cube = ledger.get_monthly_cube(backend)
+        cube.category_type_frame(year, month)
+        cube.category_totals(year, month, "Expense")
+        cube.monthly_type_frame(year)
+        month_df = ledger.query_transactions(year=year, month=month, backend=backend)
+        month_df.groupby("Date")["Amount"].sum()
+
+    def month_query_cold():
+        ledger.invalidate(backend)
+        ledger.query_transactions(year=year, month=month, backend=backend)
+
+    partitioned = None
+    if pyarrow is not None:
+        partitioned = PartitionedBackend(
+            ledger_dir=os.path.join(workdir, "ledger"),
+            goals_file=os.path.join(workdir, "partitioned_goals.csv"),
+            budgets_file=os.path.join(workdir, "partitioned_budgets.csv"),
+            hash_index_file=os.path.join(workdir, "partitioned_hashes.bin"),
+        )
+        migrate_storage(backend, partitioned)
+
+    new_row = df.iloc[[0]][["Date", "Type", "Amount", "Category", "Description"]]
+    edit_ids = itertools.cycle(df["ID"].tolist()[-100:])
+    edit_amounts = itertools.count(1)
+    delete_ids = iter(df["ID"].tolist())
+
+    def append_one():
+        ledger.append_transactions(new_row, backend=backend)
+
+    def edit_one():
+        ledger.update_transaction(next(edit_ids), {"Amount": float(next(edit_amounts))}, backend=backend)
+
+    def delete_one():
+        ledger.delete_transactions([next(delete_ids)], backend=backend)
+
+    backup_dir = os.path.join(workdir, "backups")
+    backup.create_backup(backend, backup_dir=backup_dir)
+
+    def backup_after_append():
+        append_one()
+        backup.create_backup(backend, backup_dir=backup_dir)
+
+    upload_path = os.path.join(workdir, "upload.csv")
+    upload_rows = max(1, int(rows * IMPORT_SHARE))
+    upload_seeds = itertools.count(1)
+
+    def import_merge():
+        # Half new rows, half copies of existing ones to exercise deduplication
+        upload = pd.concat([
+            generate_ledger(upload_rows // 2, seed=next(upload_seeds)),
+            df.sample(upload_rows - upload_rows // 2, random_state=0),
+        ])
+        write_ledger_csv(upload, upload_path)
+        importer.import_csv(upload_path, backend=backend)
+
+    operations = {
+        "load_expense_data_cold": cold_load,
+        "load_expense_data_cached": lambda: ledger.load_ledger(backend),
+        "monthly_cube_build": cube_build,
+        "get_monthly_summary": lambda: get_monthly_summary(year, month, backend=backend),
+        "get_total_balance": lambda: get_total_balance(backend=backend),
+        "get_top_spending_category": lambda: get_top_spending_category(backend=backend),
+        "trailing_windows": trailing_windows,
+        "budget_recommendations": lambda: get_budget_recommendations(backend=backend),
+        "goal_forecast": lambda: forecast_goals(backend.load_goals(), get_monthly_savings_rate(backend=backend)),
+        "budget_tracking": lambda: get_budget_tracking(budgets, year, month, backend=backend),
+        "monthly_cards": monthly_cards,
+        "report_aggregations": report_charts,
+        "date_range_query": lambda: ledger.query_date_range(latest - pd.Timedelta(days=30), latest, backend=backend),
+        "month_query_cold": month_query_cold,
+        **({"month_query_partitioned": lambda: partitioned.query_transactions(year, month)} if partitioned else {}),
+        "append_transaction": append_one,
+        "edit_transaction": edit_one,
+        "delete_transaction": delete_one,
+        "backup_after_append": backup_after_append,
+        "import_merge": import_merge,  # Grows the ledger, so it runs last
+    }
+    return {name: _time(func, repeat) for name, func in operations.items()}
+
+
+def run(sizes, repeat):
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            timings = benchmark_size(rows, repeat, workdir)
+        for operation, seconds in timings.items():
+            results.append({
+                "rows": rows,
+                "operation": operation,
+                "repeat": repeat,
+                "min_s": min(seconds),
+                "median_s": statistics.median(seconds),
+            })
+            print(f"{rows:>10,} {operation:<28} {min(seconds) * 1000:10.2f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Ledger sizes in rows (e.g. 10000 100000 1000000 10000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timings per operation")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Hammer one ledger with concurrent writers and check that no write is lost.
+
+Usage:
+    python -m benchmarks.stress [--backend csv|sqlite|parquet] [--processes P] [--threads T]
+                                [--ops N] [--compact-threshold K]
+
+Every thread of every process appends its own tagged transactions, edits and
+deletes some of them, and sets its own budget. Afterwards the ledger is
+re-read from storage and compared with what each writer expects to survive.
+Exits non-zero if anything is missing, duplicated or stale.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+from core import ledger
+from core.storage import CsvBackend, SqliteBackend, PartitionedBackend, set_budget_data
+
+DELETE_EVERY = 5  # Every 5th row a writer adds is deleted again
+EDIT_EVERY = 3  # and every 3rd surviving row has its amount edited
+
+
+def make_backend(kind, workdir):
+    if kind == "sqlite":
+        return SqliteBackend(
+            db_file=os.path.join(workdir, "finance.db"),
+            hash_index_file=os.path.join(workdir, "ledger_hashes.bin"),
+        )
+    if kind == "parquet":
+        return PartitionedBackend(
+            ledger_dir=os.path.join(workdir, "ledger"),
+            goals_file=os.path.join(workdir, "financial_goals.csv"),
+            budgets_file=os.path.join(workdir, "budgets.csv"),
+            hash_index_file=os.path.join(workdir, "ledger_hashes.bin"),
+        )
+    return CsvBackend(
+        expense_file=os.path.join(workdir, "add_expense.csv"),
+        goals_file=os.path.join(workdir, "financial_goals.csv"),
+        budgets_file=os.path.join(workdir, "budgets.csv"),
+        hash_index_file=os.path.join(workdir, "ledger_hashes.bin"),
+        changes_file=os.path.join(workdir, "ledger_changes.csv"),
+    )
+
+
+def _writer(backend, tag, ops, expected, errors):
+    """Run one writer's operations and record {description: amount} that should survive"""
+    try:
+        _write(backend, tag, ops, expected)
+    except Exception as exc:
+        errors.append(f"{tag}: {exc!r}")
+
+
+def _write(backend, tag, ops, expected):
+    survivors = {}
+    for i in range(ops):
+        description = f"{tag}-{i}"
+        rows = ledger.append_transactions([{
+            "Date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "Type": "Expense",
+            "Amount": float(i + 1),
+            "Category": tag,
+            "Description": description,
+        }], backend=backend)
+        transaction_id = int(rows["ID"].iloc[0])
+        if i % DELETE_EVERY == DELETE_EVERY - 1:
+            ledger.delete_transactions([transaction_id], backend=backend)
+        elif i % EDIT_EVERY == 0:
+            ledger.update_transaction(transaction_id, {"Amount": float(i + 1000)}, backend=backend)
+            survivors[description] = float(i + 1000)
+        else:
+            survivors[description] = float(i + 1)
+    set_budget_data(tag, float(ops), backend=backend)
+    expected.update(survivors)
+
+
+def _process(kind, workdir, process_index, threads, ops, compact_threshold, results):
+    ledger.LEDGER_COMPACT_THRESHOLD = compact_threshold
+    backend = make_backend(kind, workdir)
+    expected, errors = {}, []
+    workers = [
+        threading.Thread(target=_writer, args=(backend, f"p{process_index}t{t}", ops, expected, errors))
+        for t in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((expected, errors))
+
+
+def verify(backend, expected, tags):
+    """Return a list of problems found in storage (empty if everything survived)"""
+    ledger.invalidate(backend)
+    df = backend.load_transactions()
+    problems = []
+    if df["ID"].duplicated().any():
+        problems.append(f"{int(df['ID'].duplicated().sum())} duplicate IDs")
+    stored = dict(zip(df["Description"], df["Amount"]))
+    if len(stored) != len(df):
+        problems.append(f"{len(df) - len(stored)} duplicated rows")
+    missing = set(expected) - set(stored)
+    extra = set(stored) - set(expected)
+    stale = [d for d in set(expected) & set(stored) if not np.isclose(stored[d], expected[d])]
+    for label, items in (("missing", missing), ("unexpected", extra), ("stale", stale)):
+        if items:
+            problems.append(f"{len(items)} {label} rows, e.g. {sorted(items)[:3]}")
+    missing_budgets = set(tags) - set(backend.load_budgets())
+    if missing_budgets:
+        problems.append(f"{len(missing_budgets)} lost budgets, e.g. {sorted(missing_budgets)[:3]}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="Writer threads per process")
+    parser.add_argument("--ops", type=int, default=50, help="Transactions added per writer")
+    parser.add_argument("--compact-threshold", type=int, default=20,
+                        help="Change-log size that triggers compaction (low to exercise it)")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        processes = [
+            context.Process(target=_process, args=(
+                args.backend, workdir, p, args.threads, args.ops, args.compact_threshold, results
+            ))
+            for p in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        expected, errors = {}, []
+        for _ in processes:
+            process_expected, process_errors = results.get()
+            expected.update(process_expected)
+            errors += process_errors
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        if errors or any(process.exitcode != 0 for process in processes):
+            for error in errors:
+                print(f"Writer failed: {error}", file=sys.stderr)
+            return 1
+        tags = [f"p{p}t{t}" for p in range(args.processes) for t in range(args.threads)]
+        problems = verify(make_backend(args.backend, workdir), expected, tags)
+
+    writers = args.processes * args.threads
+    print(f"{writers} writers x {args.ops} ops on {args.backend} in {elapsed:.1f}s: "
+          f"{len(expected)} transactions expected")
+    for problem in problems:
+        print(f"FAIL: {problem}", file=sys.stderr)
+    if not problems:
+        print("OK: no lost, duplicated or stale writes")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
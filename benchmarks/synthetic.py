@@ -0,0 +1,66 @@
+"""Synthetic ledgers, goals and budgets with a realistic mix of entries"""
+import numpy as np
+import pandas as pd
+from config import DATE_FORMAT
+
+INCOME_CATEGORIES = ["Salary", "Freelance", "Interest", "Refund"]
+EXPENSE_CATEGORIES = [
+    "Food", "Transport", "Shopping", "Bills", "Rent", "Health",
+    "Entertainment", "Travel", "Education", "Others",
+]
+DESCRIPTIONS = ["", "", "", "groceries", "bus fare", "monthly bill", "lunch", "online order", "salary", "misc"]
+
+INCOME_SHARE = 0.08  # Most ledgers are dominated by expenses
+DAYS_PER_ROW = 0.05  # ~20 entries/day until the span reaches MAX_SPAN_DAYS
+MIN_SPAN_DAYS = 365
+MAX_SPAN_DAYS = 5 * 365  # Beyond ~36k rows larger ledgers get more entries per day, not older dates
+
+
+def generate_ledger(rows, end=None, seed=0):
+    """Return a ledger frame with ``rows`` entries spread over at most five years before ``end``"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or "2025-12-31").normalize()
+    span_days = min(MAX_SPAN_DAYS, max(MIN_SPAN_DAYS, int(rows * DAYS_PER_ROW)))
+
+    dates = end - pd.to_timedelta(rng.integers(0, span_days, rows), unit="D")
+    is_income = rng.random(rows) < INCOME_SHARE
+    categories = np.where(
+        is_income,
+        rng.choice(INCOME_CATEGORIES, rows, p=[0.7, 0.15, 0.1, 0.05]),
+        rng.choice(EXPENSE_CATEGORIES, rows),
+    )
+    amounts = np.where(
+        is_income,
+        rng.lognormal(mean=9.5, sigma=0.6, size=rows),
+        rng.lognormal(mean=5.5, sigma=1.0, size=rows),
+    ).round(2)
+
+    return pd.DataFrame({
+        "Date": dates,
+        "Type": np.where(is_income, "Income", "Expense"),
+        "Amount": amounts,
+        "Category": categories,
+        "Description": rng.choice(DESCRIPTIONS, rows),
+    })
+
+
+def generate_goals(count, seed=0):
+    """Return a goals frame with ``count`` goals and deadlines over the next few years"""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(10, 500, count) * 1000.0
+    return pd.DataFrame({
+        "Goal": [f"Goal {i + 1}" for i in range(count)],
+        "Target Amount": targets,
+        "Amount Saved": (targets * rng.random(count)).round(2),
+        "Deadline": pd.Timestamp("2026-01-01") + pd.to_timedelta(rng.integers(30, 1500, count), unit="D"),
+    })
+
+
+def generate_budgets(seed=0):
+    """Return a {category: monthly budget} mapping for every expense category"""
+    rng = np.random.default_rng(seed)
+    return {category: float(rng.integers(10, 100) * 100) for category in EXPENSE_CATEGORIES}
+
+
+def write_ledger_csv(df, path):
+    df.to_csv(path, index=False, date_format=DATE_FORMAT)
@@ -4,6 +4,7 @@ import plotly.express as px
 from datetime import datetime, timedelta
 from utils import *
 from config import *
+from core import charts
 
 st.set_page_config(page_title="Budget Management", layout=PAGE_LAYOUT)
 st.title("💰 Budget Management")
@@ -14,21 +15,11 @@ df_data = load_cached_expense_data()
 # Budget persistence helpers
 def load_budgets():
     try:
-        if os.path.exists(BUDGETS_FILE):
-            df = pd.read_csv(BUDGETS_FILE)
-            return {row['Category']: float(row['Budget']) for _, row in df.iterrows()}
+        return load_budgets_data()
     except Exception:
-        pass
-    return {}
+        return {}
 
-def save_budgets(budgets_dict):
-    try:
-        df = pd.DataFrame([(k, v) for k, v in budgets_dict.items()], columns=["Category", "Budget"])
-        df.to_csv(BUDGETS_FILE, index=False)
-    except Exception:
-        pass
-
-# Budget storage in session state (backed by CSV)
+# Budget storage in session state (backed by the storage backend)
 if 'budgets' not in st.session_state:
     st.session_state.budgets = load_budgets()
 
@@ -36,26 +27,16 @@ if 'budgets' not in st.session_state:
 def save_budget(category, amount):
     """Save budget for a category"""
     st.session_state.budgets[category] = amount
-    save_budgets(st.session_state.budgets)
+    try:
+        # Merged into the stored budgets, which also refreshes this session's copy
+        st.session_state.budgets = set_budget_data(category, amount)
+    except Exception:
+        pass
 
 def get_budget(category):
     """Get budget for a category"""
     return st.session_state.budgets.get(category, 0)
 
-def get_spent_amount(df, category, year, month):
-    """Get amount spent in a category for a specific month"""
-    filtered_df = df[(df["Date"].dt.year == year) & 
-                     (df["Date"].dt.month == month) & 
-                     (df["Type"] == "Expense") & 
-                     (df["Category"] == category)]
-    return filtered_df["Amount"].sum()
-
-def calculate_budget_progress(budget, spent):
-    """Calculate budget progress percentage"""
-    if budget == 0:
-        return 0
-    return min(100, (spent / budget) * 100)
-
 # Main budget interface
 tab1, tab2 = st.tabs(["📊 Budget Overview", "⚙️ Set Budgets"])
 
@@ -65,23 +46,22 @@ with tab1:
     # Month/Year selector
     col1, col2 = st.columns(2)
     with col1:
-        selected_year = st.selectbox("Year", sorted(df_data["Date"].dt.year.unique(), reverse=True))
+        selected_year = st.selectbox("Year", get_monthly_cube().years()[::-1])
     with col2:
         selected_month = st.selectbox("Month", range(1, 13), format_func=lambda x: datetime(2000, x, 1).strftime("%B"))
     
-    # Get current month's data
-    current_month_data = df_data[(df_data["Date"].dt.year == selected_year) & 
-                                (df_data["Date"].dt.month == selected_month)]
+    # Get current month's totals
+    month_summary = get_monthly_summary(selected_year, selected_month)
     
-    if current_month_data.empty:
+    if month_summary["transactions"] == 0:
         show_info_message("No data available for selected month.")
     else:
         # Overall budget summary
         st.markdown("### 📈 Overall Budget Summary")
         
         total_budget = sum(st.session_state.budgets.values())
-        total_spent = current_month_data[current_month_data["Type"] == "Expense"]["Amount"].sum()
-        total_income = current_month_data[current_month_data["Type"] == "Income"]["Amount"].sum()
+        total_spent = month_summary["expense"]
+        total_income = month_summary["income"]
         
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -111,20 +91,7 @@ with tab1:
         st.markdown("### 📋 Category-wise Budget Tracking")
         
         if st.session_state.budgets:
-            budget_data = []
-            for category, budget_amount in st.session_state.budgets.items():
-                spent_amount = get_spent_amount(df_data, category, selected_year, selected_month)
-                progress = calculate_budget_progress(budget_amount, spent_amount)
-                
-                budget_data.append({
-                    "Category": category,
-                    "Budget": budget_amount,
-                    "Spent": spent_amount,
-                    "Remaining": budget_amount - spent_amount,
-                    "Progress": progress
-                })
-            
-            budget_df = pd.DataFrame(budget_data)
+            budget_df = get_budget_tracking(st.session_state.budgets, selected_year, selected_month)
             
             # Display budget table
             st.dataframe(
@@ -139,24 +106,11 @@ with tab1:
             )
             
             # Budget vs Spent chart
-            fig = px.bar(
-                budget_df, 
-                x="Category", 
-                y=["Budget", "Spent"],
-                title="Budget vs Spent by Category",
-                barmode="group"
-            )
+            fig = charts.budget_vs_spent(st.session_state.budgets, selected_year, selected_month)
             st.plotly_chart(fig, use_container_width=True)
             
             # Progress chart
-            fig_progress = px.bar(
-                budget_df,
-                x="Category",
-                y="Progress",
-                title="Budget Progress by Category (%)",
-                color="Progress",
-                color_continuous_scale=["green", "yellow", "red"]
-            )
+            fig_progress = charts.budget_progress(st.session_state.budgets, selected_year, selected_month)
             st.plotly_chart(fig_progress, use_container_width=True)
         else:
             show_info_message("No budgets set. Go to 'Set Budgets' tab to create budgets.")
@@ -232,14 +186,15 @@ with tab2:
     st.markdown("### 💡 Budget Recommendations")
     
     if not df_data.empty:
-        # Analyze spending patterns
-        recent_data = df_data[df_data["Date"] >= datetime.now() - timedelta(days=90)]
-        avg_spending = recent_data[recent_data["Type"] == "Expense"].groupby("Category")["Amount"].mean()
+        # Budget that would have covered 80% of the last 12 complete months
+        recommendations = get_budget_recommendations(months=12, percentile=80)
         
-        st.markdown("Based on your recent spending patterns:")
-        for category, avg_amount in avg_spending.items():
-            recommended_budget = avg_amount * 1.2  # 20% buffer
-            st.write(f"**{category}**: Average spending {format_currency(avg_amount)}, recommended budget {format_currency(recommended_budget)}")
+        if recommendations.empty:
+            st.info("Recommendations appear once you have a full month of expenses.")
+        else:
+            st.markdown("Based on your monthly spending over the last year:")
+        for category, avg_amount, recommended_budget in recommendations.itertuples(index=False):
+            st.write(f"**{category}**: Average monthly spending {format_currency(avg_amount)}, recommended budget {format_currency(recommended_budget)}")
     
     # Export/Import budgets
     st.markdown("### 📁 Budget Data Management")
@@ -7,6 +7,15 @@ EXPENSE_FILE = os.path.join(DATA_DIR, "add_expense.csv")
 GOALS_FILE = os.path.join(DATA_DIR, "financial_goals.csv")
 BACKUP_DIR = "backups"
 BUDGETS_FILE = os.path.join(DATA_DIR, "budgets.csv")
+DATABASE_FILE = os.path.join(DATA_DIR, "finance.db")
+HASH_INDEX_FILE = os.path.join(DATA_DIR, "ledger_hashes.bin")
+CHANGES_FILE = os.path.join(DATA_DIR, "ledger_changes.csv")  # Deletes/edits not yet compacted
+LEDGER_DIR = os.path.join(DATA_DIR, "ledger")  # Month partitions when STORAGE_BACKEND = "parquet"
+USERS_DIR = os.path.join(DATA_DIR, "users")  # One directory of the files above (plus backups) per user
+
+# Storage backend: "csv" (default), "sqlite" or "parquet" (month-partitioned, needs pyarrow)
+# Run `python -m core migrate --to sqlite|parquet` once before switching
+STORAGE_BACKEND = "csv"
 
 # Ensure directories exist
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -27,6 +36,29 @@ MAX_AMOUNT = 1000000  # Maximum transaction amount
 MAX_DESCRIPTION_LENGTH = 200
 MIN_AMOUNT = 0.01
 
+# Rewrite the ledger file once this many deletes/edits are pending in the change log
+LEDGER_COMPACT_THRESHOLD = 500
+
+# CSV import
+IMPORT_CHUNK_SIZE = 50000  # Rows read and committed per chunk
+IMPORT_PREVIEW_ROWS = 20
+
+# Transactions table
+TRANSACTIONS_PAGE_SIZES = [25, 50, 100, 250]  # First entry is the default
+
+# Charts
+CHART_MAX_POINTS = 500  # Line charts switch to weekly/monthly points beyond this
+FIGURE_CACHE_SIZE = 64  # Built figures kept across reruns and sessions
+CHART_RANGES = {"All time": None, "Last 12 months": 365, "Last 90 days": 90, "Last 30 days": 30}
+
+# Per-user data
+USER_QUERY_PARAM = "user"  # ?user=<id> picks the data directory when authentication isn't configured
+LEDGER_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Cached ledgers of the least recently active users are dropped beyond this
+
+# Background refresh of aggregates and figures after writes
+REFRESH_WORKERS = 2
+REFRESH_DELAY = 0.2  # Seconds to wait for a burst of writes before refreshing
+
 # App settings
 APP_TITLE = "Personal Finance Tracker"
 APP_ICON = "💸"
@@ -0,0 +1,32 @@
+"""Streamlit-free data layer: storage, ledger cache, analytics, import and backups.
+
+Pages call into this package for everything that isn't UI, and scripts or
+worker processes can import it without loading the Streamlit runtime.
+"""
+from .storage import (
+    ID_COLUMN, LEDGER_COLUMNS, GOALS_COLUMNS, CsvBackend, SqliteBackend, PartitionedBackend, get_backend,
+    goals_version, load_goals_data, save_goals_data, update_goals_data, load_budgets_data, save_budgets_data,
+    set_budget_data, migrate_csv_to_sqlite, migrate_storage, user_backend, user_data_dir, set_current_user,
+    current_user
+)
+from .atomic import ConflictError, FileLock, atomic_write
+from .ledger import (
+    load_ledger, save_ledger, append_transactions, delete_transactions, update_transaction, compact_ledger,
+    query_transactions, query_date_range, query_date_range_page, count_date_range,
+    get_monthly_cube, get_daily_sums, get_spending_stats, get_compact_ledger, get_hash_index, invalidate,
+    ledger_version, add_listener, cache_stats
+)
+from .validation import (
+    validate_amount, valid_dates, validate_category, validate_description, sanitize_input, validate_entry
+)
+from .analytics import (
+    get_monthly_summary, get_budget_tracking, calculate_budget_progress, get_category_spending_stats,
+    get_budget_recommendations,
+    get_total_balance, get_balance_as_of, get_balance_series, get_overview_totals, get_expenses_by_category, get_cash_flow,
+    get_top_spending_category, get_average_daily_spending, get_monthly_savings_rate, get_period_bounds
+)
+from .goals import forecast_goals
+from .downsample import downsample_series, lttb
+from .figures import FigureCache, cached_figure, figure_cache_stats
+from .backup import create_backup, list_backups, restore_backup, cleanup_old_backups
+from .importer import import_csv, summarize_csv, missing_columns
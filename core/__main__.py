@@ -0,0 +1,34 @@
+"""Command line entry point.
+
+    python -m core migrate [--to sqlite|parquet] [--overwrite]
+    python -m core compact [--user ID]
+"""
+import sys
+from .storage import BACKENDS, CsvBackend, migrate_storage, get_backend, set_current_user
+from .ledger import compact_ledger
+
+USAGE = "Usage: python -m core migrate [--to sqlite|parquet] [--overwrite] | python -m core compact [--user ID]"
+
+command, options = sys.argv[1:2], sys.argv[2:]
+if command == ["migrate"]:
+    overwrite = "--overwrite" in options
+    options = [option for option in options if option != "--overwrite"]
+    target = "sqlite"
+    if options[:1] == ["--to"] and len(options) == 2 and options[1] in BACKENDS and options[1] != "csv":
+        target = options[1]
+    elif options:
+        sys.exit(USAGE)
+    backend = BACKENDS[target]()
+    counts = migrate_storage(CsvBackend(), backend, overwrite=overwrite)
+    print(f"Migrated {counts['transactions']} transactions, {counts['goals']} goals "
+          f"and {counts['budgets']} budgets into {backend.key}")
+elif command == ["compact"]:
+    if options[:1] == ["--user"] and len(options) == 2:
+        set_current_user(options[1])
+    elif options:
+        sys.exit(USAGE)
+    pending = get_backend().pending_changes()
+    compact_ledger()
+    print(f"Folded {pending} pending deletes/edits into the ledger")
+else:
+    sys.exit(USAGE)
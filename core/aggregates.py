@@ -0,0 +1,434 @@
+"""Derived structures maintained alongside the cached ledger.
+
+``MonthlyCube`` keeps (year, month, type, category) -> (sum, count) cells so
+month cards, budget tracking and yearly summaries are dictionary lookups
+instead of boolean masks over every transaction. ``DateIndex`` keeps the row
+positions ordered by date so date-range filters are binary searches.
+``DailySums`` keeps running per-day, per-category totals so any trailing
+window (last 7, 30, 90 or 365 days) is two row lookups, and the balance on
+any date is one.
+
+The cube, the date index and the daily sums are built once from the cached
+ledger and then adjusted by the rows that are inserted or deleted. Updates
+return a patched copy so readers holding the previous version never see a
+half-applied change.
+
+``SpendingStats`` is not maintained per row: it is derived from the cube's
+month cells (per-category monthly totals) and rebuilt lazily whenever the
+ledger version changes. It provides the mean, EWMA, spread and percentiles
+behind budget recommendations without reading transactions.
+"""
+import numpy as np
+import pandas as pd
+from .compact import CompactLedger, TYPE_LABELS, INCOME, EXPENSE
+
+
+class MonthlyCube:
+    """(year, month, type, category) -> [paise, count], maintained incrementally.
+
+    Sums are kept as integer paise so repeated inserts and deletes never
+    drift; the query methods return rupees.
+    """
+
+    def __init__(self):
+        self._cells = {}  # (year, month) -> {(type, category): [paise, count]}
+        self._shared = set()  # Months whose cells are still shared with another copy
+
+    @classmethod
+    def from_compact(cls, compact):
+        cube = cls()
+        cube._add_compact(compact, 1)
+        return cube
+
+    @classmethod
+    def from_ledger(cls, df):
+        return cls.from_compact(CompactLedger.from_frame(df))
+
+    def add(self, df, sign=1):
+        """Fold a batch of transactions into the cube (sign=-1 removes them)"""
+        if df.empty:
+            return
+        self._add_compact(CompactLedger.from_frame(df), sign)
+
+    def _add_compact(self, compact, sign):
+        if len(compact) == 0:
+            return
+        # One integer key per (month, type, category) so the group-by is a bincount
+        months = compact.dates.astype("datetime64[M]").astype("int64")
+        codes = compact.category.codes.astype("int64") + 1  # 0 = missing category
+        n_codes = len(compact.category.categories) + 1
+        keys = (months * 3 + (compact.signs + 1)) * n_codes + codes
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.rint(np.bincount(inverse, weights=compact.paise)).astype("int64")
+        counts = np.bincount(inverse)
+        labels = compact.category.categories
+
+        for key, total, count in zip(unique.tolist(), sums.tolist(), counts.tolist()):
+            rest, code = divmod(key, n_codes)
+            month_index, sign_index = divmod(rest, 3)
+            year, month = divmod(month_index, 12)
+            year, month = year + 1970, month + 1
+            cell_key = (TYPE_LABELS[sign_index - 1], labels[code - 1] if code else None)
+
+            month_cells = self._writable_month((year, month))
+            cell = month_cells.setdefault(cell_key, [0, 0])
+            cell[0] += sign * total
+            cell[1] += sign * count
+            if cell[1] <= 0:
+                del month_cells[cell_key]
+                if not month_cells:
+                    del self._cells[(year, month)]
+
+    def remove(self, df):
+        """Take a batch of deleted transactions back out of the cube"""
+        self.add(df, sign=-1)
+
+    def _writable_month(self, key):
+        if key in self._shared:
+            self._shared.discard(key)
+            self._cells[key] = {cell_key: list(cell) for cell_key, cell in self._cells[key].items()}
+        return self._cells.setdefault(key, {})
+
+    def copy(self):
+        """Copy-on-write copy: months are duplicated only when a patch touches them"""
+        other = MonthlyCube()
+        other._cells = dict(self._cells)
+        other._shared = set(self._cells)
+        self._shared = set(self._cells)
+        return other
+
+    def _iter_cells(self, year, month=None):
+        months = [month] if month is not None else range(1, 13)
+        for m in months:
+            for key, cell in self._cells.get((int(year), int(m)), {}).items():
+                yield m, key, cell
+
+    def years(self):
+        """Years that have at least one transaction"""
+        return sorted({year for year, _ in self._cells})
+
+    def summary(self, year, month=None):
+        """Income, expense, net and transaction count for a year or month"""
+        income = expense = 0
+        transactions = 0
+        for _, (entry_type, _), (total, count) in self._iter_cells(year, month):
+            if entry_type == "Income":
+                income += total
+            elif entry_type == "Expense":
+                expense += total
+            transactions += count
+        income, expense = income / 100, expense / 100
+        return {
+            "income": income,
+            "expense": expense,
+            "net": income - expense,
+            "transactions": transactions,
+        }
+
+    def category_totals(self, year, month=None, entry_type=None):
+        """Return {category: sum} for a year or month, optionally by type"""
+        totals = {}
+        for _, (cell_type, category), (total, _) in self._iter_cells(year, month):
+            if entry_type is None or cell_type == entry_type:
+                totals[category] = totals.get(category, 0) + total
+        return {category: total / 100 for category, total in totals.items()}
+
+    def category_type_frame(self, year, month=None):
+        """Category/Type/Amount rows for a year or month, as used by the bar charts"""
+        rows = {}
+        for _, key, (total, _) in self._iter_cells(year, month):
+            rows[key] = rows.get(key, 0) + total
+        return pd.DataFrame(
+            [(category, entry_type, total / 100) for (entry_type, category), total in rows.items()],
+            columns=["Category", "Type", "Amount"],
+        )
+
+    def category_months(self, entry_type):
+        """Return (labels, months, paise): one row per category, one column per month.
+
+        Months run from the first to the last month in the cube as
+        ``datetime64[M]``; months without rows for a category hold zero.
+        """
+        if not self._cells:
+            return [], np.array([], dtype="datetime64[M]"), np.zeros((0, 0), dtype="int64")
+        keys = sorted(self._cells)
+        first = np.datetime64(f"{keys[0][0]:04d}-{keys[0][1]:02d}", "M")
+        last = np.datetime64(f"{keys[-1][0]:04d}-{keys[-1][1]:02d}", "M")
+        months = np.arange(first, last + 1)
+        rows = {}
+        for (year, month), cells in self._cells.items():
+            column = (year - 1970) * 12 + month - 1 - int(first.astype("int64"))
+            for (cell_type, category), (total, _) in cells.items():
+                if cell_type == entry_type and category is not None:
+                    rows.setdefault(category, {})[column] = total
+        labels = sorted(rows)
+        paise = np.zeros((len(labels), len(months)), dtype="int64")
+        for row, category in enumerate(labels):
+            columns = rows[category]
+            paise[row, list(columns)] = list(columns.values())
+        return labels, months, paise
+
+    def monthly_type_frame(self, year):
+        """Month/Type/Amount rows for every month of a year"""
+        rows = {}
+        for month, (entry_type, _), (total, _) in self._iter_cells(year):
+            rows[(month, entry_type)] = rows.get((month, entry_type), 0) + total
+        return pd.DataFrame(
+            [(month, entry_type, total / 100) for (month, entry_type), total in sorted(rows.items())],
+            columns=["Month", "Type", "Amount"],
+        )
+
+
+class DateIndex:
+    """Ledger row positions sorted by date, for O(log n + k) range slices"""
+
+    def __init__(self, order, sorted_dates):
+        self.order = order
+        self.sorted_dates = sorted_dates
+
+    @classmethod
+    def from_ledger(cls, df):
+        dates = df["Date"].to_numpy(dtype="datetime64[ns]")
+        order = np.argsort(dates, kind="stable")
+        return cls(order, dates[order])
+
+    def extended(self, new_dates, offset):
+        """Return an index that also covers rows appended at position ``offset``"""
+        new_dates = np.asarray(new_dates, dtype="datetime64[ns]")
+        new_order = np.argsort(new_dates, kind="stable")
+        new_sorted = new_dates[new_order]
+        slots = np.searchsorted(self.sorted_dates, new_sorted, side="right")
+        return DateIndex(
+            np.insert(self.order, slots, new_order + offset),
+            np.insert(self.sorted_dates, slots, new_sorted),
+        )
+
+    def replaced(self, positions, new_dates):
+        """Return an index where the rows at ``positions`` carry ``new_dates``"""
+        kept = ~np.isin(self.order, positions)
+        order, sorted_dates = self.order[kept], self.sorted_dates[kept]
+        for position, day in zip(positions, np.asarray(new_dates, dtype="datetime64[ns]")):
+            # Rows sharing a date stay in position order, as in a fresh build
+            lo = np.searchsorted(sorted_dates, day, side="left")
+            hi = np.searchsorted(sorted_dates, day, side="right")
+            slot = lo + np.searchsorted(order[lo:hi], position)
+            order = np.insert(order, slot, position)
+            sorted_dates = np.insert(sorted_dates, slot, day)
+        return DateIndex(order, sorted_dates)
+
+    def without(self, positions, size):
+        """Return an index for the frame left after dropping ``positions`` and renumbering"""
+        keep = np.ones(size, dtype=bool)
+        keep[positions] = False
+        renumber = np.cumsum(keep) - 1
+        kept = keep[self.order]
+        return DateIndex(renumber[self.order[kept]], self.sorted_dates[kept])
+
+    def positions(self, start, end):
+        """Row positions with start <= Date < end, in date order"""
+        lo = np.searchsorted(self.sorted_dates, np.datetime64(start, "ns"), side="left")
+        hi = np.searchsorted(self.sorted_dates, np.datetime64(end, "ns"), side="left")
+        return self.order[lo:hi]
+
+
+class DailySums:
+    """Cumulative per-day, per-category income and expense sums and counts.
+
+    Row ``i`` of each array holds the totals of every day before
+    ``start + i``, with one column per category plus a last column for rows
+    without one, so the totals of days ``[a, b)`` are ``cum[b] - cum[a]``
+    whatever the window length. Sums are integer paise.
+
+    ``balance`` is the signed running total (income minus expenses) over the
+    same rows, so the current balance and the balance as of any date are a
+    single lookup.
+    """
+
+    TYPES = (INCOME, EXPENSE)
+
+    def __init__(self, start, categories, sums, counts):
+        self.start = start  # datetime64[D] of row 0, or None when empty
+        self.categories = categories
+        self.sums = sums  # type sign -> int64 array (days + 1, categories + 1)
+        self.counts = counts  # type sign -> int32 array of the same shape
+        self.balance = sums[INCOME].sum(axis=1) - sums[EXPENSE].sum(axis=1)
+
+    @classmethod
+    def from_compact(cls, compact):
+        valid = ~np.isnat(compact.dates)
+        categories = compact.category.categories
+        width = len(categories) + 1
+        if not valid.any():
+            zeros = {sign: np.zeros((1, width), dtype="int64") for sign in cls.TYPES}
+            return cls(None, categories, zeros, {sign: z.astype("int32") for sign, z in zeros.items()})
+
+        dates = compact.dates[valid]
+        start = dates.min()
+        days = int((dates.max() - start).astype("int64")) + 1
+        codes = compact.category.codes[valid].astype("int64")
+        cells = (dates - start).astype("int64") * width + np.where(codes >= 0, codes, width - 1)
+        sums, counts = {}, {}
+        for sign in cls.TYPES:
+            rows = compact.signs[valid] == sign
+            daily_sums = np.bincount(cells[rows], weights=compact.paise[valid][rows], minlength=days * width)
+            daily_counts = np.bincount(cells[rows], minlength=days * width)
+            sums[sign] = cls._cumulative(np.rint(daily_sums).astype("int64").reshape(days, width))
+            counts[sign] = cls._cumulative(daily_counts.astype("int32").reshape(days, width))
+        return cls(start, categories, sums, counts)
+
+    @classmethod
+    def from_ledger(cls, df):
+        return cls.from_compact(CompactLedger.from_frame(df))
+
+    @staticmethod
+    def _cumulative(daily):
+        cumulative = np.zeros((daily.shape[0] + 1, daily.shape[1]), dtype=daily.dtype)
+        np.cumsum(daily, axis=0, out=cumulative[1:])
+        return cumulative
+
+    def __len__(self):
+        """Number of days covered"""
+        return self.sums[INCOME].shape[0] - 1
+
+    def nbytes(self):
+        return self.balance.nbytes + sum(array.nbytes for array in (*self.sums.values(), *self.counts.values()))
+
+    def added(self, df, sign=1):
+        """Return sums that also hold the rows of ``df`` (sign=-1 takes them out)"""
+        if df.empty:
+            return self
+        other = DailySums.from_ledger(df)
+        if other.start is None:
+            return self
+        if self.start is None:
+            start, end = other.start, other.start + len(other)
+        else:
+            start = min(self.start, other.start)
+            end = max(self.start + len(self), other.start + len(other))
+        categories = self.categories.union(other.categories, sort=False)
+        sums, counts = {}, {}
+        for sign_type in self.TYPES:
+            sums[sign_type] = (self._aligned(self.sums[sign_type], start, end, categories)
+                               + sign * other._aligned(other.sums[sign_type], start, end, categories))
+            counts[sign_type] = (self._aligned(self.counts[sign_type], start, end, categories)
+                                 + sign * other._aligned(other.counts[sign_type], start, end, categories))
+        return DailySums(start, categories, sums, counts)
+
+    def _aligned(self, cumulative, start, end, categories):
+        """``cumulative`` re-laid over days ``[start, end)`` and the columns of ``categories``"""
+        days = int((end - start).astype("int64"))
+        result = np.zeros((days + 1, len(categories) + 1), dtype=cumulative.dtype)
+        if self.start is None:
+            return result
+        columns = np.append(categories.get_indexer(self.categories), len(categories))
+        # Before our first day the running total is zero; after our last it stays at the final row
+        offset = int((self.start - start).astype("int64"))
+        result[offset:offset + len(self) + 1, columns] = cumulative
+        result[offset + len(self) + 1:, columns] = cumulative[-1]
+        return result
+
+    def _row(self, day):
+        """Cumulative row index for the start of ``day``"""
+        if self.start is None:
+            return 0
+        return int(np.clip((np.datetime64(day, "D") - self.start).astype("int64"), 0, len(self)))
+
+    def window(self, entry_type, start=None, end=None):
+        """Per-column (paise, count) arrays of ``entry_type`` rows dated ``start`` <= day < ``end``.
+
+        ``None`` leaves that side open. Columns follow ``categories`` with the
+        uncategorized rows last.
+        """
+        lo = 0 if start is None else self._row(start)
+        hi = len(self) if end is None else self._row(end)
+        sums, counts = self.sums[entry_type], self.counts[entry_type]
+        return sums[hi] - sums[lo], counts[hi] - counts[lo]
+
+    def total(self, entry_type, start=None, end=None):
+        """Sum in paise of ``entry_type`` rows in the window, categorized or not"""
+        return int(self.window(entry_type, start, end)[0].sum())
+
+    def balance_at(self, day=None):
+        """Income minus expenses in paise up to the end of ``day`` (None = every row)"""
+        if day is None:
+            return int(self.balance[-1])
+        return int(self.balance[self._row(np.datetime64(pd.Timestamp(day), "D") + 1)])
+
+    def balance_frame(self):
+        """Date/Balance rows of the end-of-day balance in rupees for every day covered"""
+        if self.start is None:
+            return pd.DataFrame({"Date": pd.Series(dtype="datetime64[ns]"), "Balance": pd.Series(dtype="float64")})
+        return pd.DataFrame({
+            "Date": (self.start + np.arange(len(self))).astype("datetime64[ns]"),
+            "Balance": self.balance[1:] / 100,
+        })
+
+    def category_stats(self, entry_type, start=None, end=None):
+        """Return (labels, sum in paise, count) for categories with rows in the window"""
+        sums, counts = self.window(entry_type, start, end)
+        sums, counts = sums[:-1], counts[:-1]
+        present = counts > 0
+        return self.categories[present], sums[present], counts[present]
+
+
+class SpendingStats:
+    """Per-category statistics of monthly totals, derived from the cube.
+
+    Every write already patches the cube, so these are rebuilt from its
+    month cells (categories x months) and never from transactions. A
+    category's history starts at its first month with rows; later months
+    without rows count as zero spending.
+    """
+
+    def __init__(self, categories, months, paise):
+        self.categories = categories
+        self.months = months  # datetime64[M] of each column
+        self.paise = paise  # int64 (categories, months)
+        # Column of each category's first rows
+        active = paise != 0
+        self.first = np.full(len(categories), len(months))
+        if active.size:
+            self.first = np.where(active.any(axis=1), active.argmax(axis=1), len(months))
+
+    @classmethod
+    def from_cube(cls, cube, entry_type="Expense"):
+        return cls(*cube.category_months(entry_type))
+
+    def nbytes(self):
+        return self.paise.nbytes + self.months.nbytes + self.first.nbytes
+
+    def summary(self, months=12, until=None, percentile=80, alpha=0.3):
+        """Category, Months, Mean, EWMA, Std and Percentile of monthly totals in rupees.
+
+        Covers the ``months`` calendar months before ``until`` (a
+        ``datetime64[M]``, exclusive; None = after the last month with rows).
+        ``EWMA`` weights the latest month by ``alpha``. Categories without
+        rows in the window are left out.
+        """
+        columns = ["Category", "Months", "Mean", "EWMA", "Std", "Percentile"]
+        if len(self.months) == 0 or months <= 0:
+            return pd.DataFrame(columns=columns)
+        until = self.months[-1] + 1 if until is None else np.datetime64(until, "M")
+        # Column positions of the window months; those outside the cube have no rows
+        positions = np.arange(until - months, until) - self.months[0]
+        positions = positions.astype("int64")
+        inside = (positions >= 0) & (positions < len(self.months))
+        values = np.zeros((len(self.categories), months))
+        values[:, inside] = self.paise[:, positions[inside]] / 100
+        tracked = positions[None, :] >= self.first[:, None]
+        present = (values != 0).any(axis=1)
+        values, tracked = values[present], tracked[present]
+        history = np.where(tracked, values, np.nan)
+
+        ewma = np.full(len(values), np.nan)
+        for column in history.T:
+            ewma = np.where(np.isnan(ewma), column, np.where(np.isnan(column), ewma, alpha * column + (1 - alpha) * ewma))
+        count = tracked.sum(axis=1)
+        return pd.DataFrame({
+            "Category": np.asarray(self.categories, dtype=object)[present],
+            "Months": count,
+            "Mean": np.nanmean(history, axis=1),
+            "EWMA": ewma,
+            "Std": np.nanstd(history, axis=1),
+            "Percentile": np.nanpercentile(history, percentile, axis=1),
+        }, columns=columns)
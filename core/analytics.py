@@ -0,0 +1,128 @@
+"""Aggregations behind the dashboard, report, budget and transaction pages"""
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from .compact import INCOME, EXPENSE, first_day_on_or_after
+from .ledger import get_monthly_cube, get_compact_ledger, get_daily_sums, get_spending_stats
+
+
+def get_monthly_summary(year, month=None, backend=None):
+    """Get summary for a specific year and month (or whole year) from the aggregate cube"""
+    return get_monthly_cube(backend).summary(year, month)
+
+
+def get_budget_tracking(budgets, year, month, backend=None):
+    """Budget, spent, remaining and progress for every budgeted category in one pass"""
+    budget = pd.Series(budgets, dtype="float64")
+    spent = pd.Series(get_monthly_cube(backend).category_totals(year, month, "Expense"), dtype="float64")
+    spent = spent.reindex(budget.index, fill_value=0.0)
+    progress = (spent / budget.where(budget != 0) * 100).clip(upper=100).fillna(0.0)
+    return pd.DataFrame({
+        "Category": budget.index,
+        "Budget": budget.values,
+        "Spent": spent.values,
+        "Remaining": (budget - spent).values,
+        "Progress": progress.values
+    })
+
+
+def calculate_budget_progress(budget, spent):
+    """Calculate budget progress percentage"""
+    if budget == 0:
+        return 0
+    return min(100, (spent / budget) * 100)
+
+
+def get_category_spending_stats(months=12, percentile=80, alpha=0.3, backend=None):
+    """Mean, EWMA, spread and ``percentile`` of monthly spending per category over the last complete months"""
+    this_month = np.datetime64(datetime.now(), "M")
+    return get_spending_stats(backend).summary(months, this_month, percentile, alpha)
+
+
+def get_budget_recommendations(months=12, percentile=80, backend=None):
+    """Average monthly spending per category and a budget covering ``percentile`` % of recent months"""
+    stats = get_category_spending_stats(months, percentile, backend=backend)
+    return pd.DataFrame({
+        "Category": stats["Category"],
+        "Average": stats["Mean"],
+        "Recommended": stats["Percentile"]
+    })
+
+
+def get_total_balance(backend=None):
+    """Calculate total balance (income - expenses)"""
+    return get_daily_sums(backend).balance_at() / 100
+
+
+def get_balance_as_of(date, backend=None):
+    """Balance (income - expenses) of every transaction dated up to and including ``date``"""
+    return get_daily_sums(backend).balance_at(date) / 100
+
+
+def get_balance_series(backend=None):
+    """Date/Balance rows of the end-of-day running balance"""
+    return get_daily_sums(backend).balance_frame()
+
+
+def get_overview_totals(backend=None):
+    """All-time income, expenses, net savings and savings ratio"""
+    daily = get_daily_sums(backend)
+    income = daily.total(INCOME) / 100
+    expense = daily.total(EXPENSE) / 100
+    net = income - expense
+    return {
+        "income": income,
+        "expense": expense,
+        "net": net,
+        "savings_ratio": net / income if income != 0 else 0
+    }
+
+
+def get_expenses_by_category(backend=None):
+    """Category/Amount rows of total expenses, as used by the pie charts"""
+    compact = get_compact_ledger(backend)
+    categories, sums, _ = compact.category_stats(compact.mask(EXPENSE))
+    return pd.DataFrame({"Category": categories, "Amount": sums / 100})
+
+
+def get_cash_flow(df):
+    """Date/Amount rows of the total amount moved per day"""
+    return df.groupby("Date")["Amount"].sum().reset_index()
+
+
+def get_top_spending_category(months=1, backend=None):
+    """Get top spending category for the last N months"""
+    since = first_day_on_or_after(datetime.now() - timedelta(days=30*months))
+    categories, sums, _ = get_daily_sums(backend).category_stats(EXPENSE, since)
+
+    if len(categories) == 0:
+        return "No expenses"
+
+    return categories[sums.argmax()]
+
+
+def get_average_daily_spending(days=30, backend=None):
+    """Calculate average daily spending"""
+    since = first_day_on_or_after(datetime.now() - timedelta(days=days))
+    total_expense = get_daily_sums(backend).total(EXPENSE, since) / 100
+    return total_expense / days
+
+
+def get_monthly_savings_rate(days=90, backend=None):
+    """Net savings (income - expenses) per month over the last ``days`` days"""
+    since = first_day_on_or_after(datetime.now() - timedelta(days=days))
+    daily = get_daily_sums(backend)
+    net = (daily.total(INCOME, since) - daily.total(EXPENSE, since)) / 100
+    return net / days * 365.25 / 12
+
+
+def get_period_bounds(period, today=None):
+    """Start and end of "This Week", "This Month" or "This Year" relative to today"""
+    today = today or datetime.now()
+    if period == "This Week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "This Month":
+        return today.replace(day=1), today
+    if period == "This Year":
+        return today.replace(month=1, day=1), today
+    raise ValueError(f"Unknown period: {period!r}")
@@ -0,0 +1,235 @@
+"""Incremental, content-addressed backups of the data files.
+
+Every backend keeps its own store in ``backend.backup_dir`` (``BACKUP_DIR``
+for the shared data, a ``backups`` folder in each user's directory).
+
+Each file is split into content-defined chunks: a chunk ends after any line
+whose CRC matches ``CHUNK_MASK``, so inserting or editing a row only changes
+the chunk around it. Chunks are stored once, zlib-compressed, under
+``objects`` named by their SHA-256, and a snapshot is a small JSON
+manifest in ``snapshots`` listing the chunks of every file.
+
+A backup costs what changed since the previous snapshot:
+
+- files whose inode, size and mtime are unchanged are not read at all
+- append-only files (the CSV ledger and its change log) only re-chunk from
+  the start of their last chunk, since rewrites always replace the file
+- a snapshot identical to the latest one is not written again
+"""
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from .atomic import atomic_write
+from .ledger import invalidate
+from .storage import get_backend
+
+SNAPSHOT_ID_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+CHUNK_MASK = (1 << 10) - 1  # ~1024 lines per chunk on average
+MAX_CHUNK_BYTES = 1 << 20  # Upper bound for files with few or no newlines
+APPEND_ONLY = {"transactions", "changes"}  # Only ever appended to in place
+
+
+def split_chunks(data):
+    """Split bytes into content-defined chunks on line boundaries"""
+    chunks = []
+    start = 0
+    position = 0
+    size = len(data)
+    while position < size:
+        end = data.find(b"\n", position)
+        end = size if end < 0 else end + 1
+        if end - start > MAX_CHUNK_BYTES:
+            end = start + MAX_CHUNK_BYTES
+        if (zlib.crc32(data[position:end]) & CHUNK_MASK) == 0 or end - start >= MAX_CHUNK_BYTES or end == size:
+            chunks.append(data[start:end])
+            start = end
+        position = end
+    return chunks
+
+
+def _objects_dir(backup_dir):
+    return os.path.join(backup_dir, "objects")
+
+
+def _snapshots_dir(backup_dir):
+    return os.path.join(backup_dir, "snapshots")
+
+
+def _object_path(backup_dir, digest):
+    return os.path.join(_objects_dir(backup_dir), digest[:2], digest)
+
+
+def _store_chunk(backup_dir, chunk):
+    """Store a chunk unless an identical one exists and return its digest"""
+    digest = hashlib.sha256(chunk).hexdigest()
+    path = _object_path(backup_dir, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, "wb") as f:
+            f.write(zlib.compress(chunk))
+    return digest
+
+
+def _load_chunk(backup_dir, digest):
+    with open(_object_path(backup_dir, digest), "rb") as f:
+        chunk = zlib.decompress(f.read())
+    if hashlib.sha256(chunk).hexdigest() != digest:
+        raise ValueError(f"Backup chunk {digest} is corrupted")
+    return chunk
+
+
+def _read_range(path, offset, length=None):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read() if length is None else f.read(length)
+
+
+def _chunk_file(backup_dir, path, stat, previous, append_only):
+    """Return the manifest entry for one file, reusing ``previous`` where possible"""
+    entry = {"inode": stat.st_ino, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    same_file = previous is not None and previous["inode"] == stat.st_ino
+    if same_file and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+        return {**entry, "chunks": previous["chunks"]}
+
+    kept = []
+    offset = 0
+    if append_only and same_file and previous["chunks"] and stat.st_size >= previous["size"]:
+        # Keep every chunk but the last; check the first and last kept ones still match
+        kept = previous["chunks"][:-1]
+        offset = sum(length for _, length in kept)
+        checked = {0, len(kept) - 1} if kept else set()
+        for index in checked:
+            digest, length = kept[index]
+            start = sum(length for _, length in kept[:index])
+            if hashlib.sha256(_read_range(path, start, length)).hexdigest() != digest:
+                kept, offset = [], 0
+                break
+
+    new_chunks = [[_store_chunk(backup_dir, chunk), len(chunk)] for chunk in split_chunks(_read_range(path, offset))]
+    return {**entry, "chunks": kept + new_chunks}
+
+
+def _manifest_path(backup_dir, snapshot_id):
+    return os.path.join(_snapshots_dir(backup_dir), f"{snapshot_id}.json")
+
+
+def _read_manifest(backup_dir, snapshot_id):
+    with open(_manifest_path(backup_dir, snapshot_id)) as f:
+        return json.load(f)
+
+
+def _snapshot_ids(backup_dir):
+    snapshots_dir = _snapshots_dir(backup_dir)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(name[:-5] for name in os.listdir(snapshots_dir) if name.endswith(".json"))
+
+
+def create_backup(backend=None, full=False, backup_dir=None):
+    """Snapshot the backend's data files and return the snapshot ID.
+
+    ``full=True`` re-reads every file instead of trusting unchanged metadata.
+    If nothing changed since the latest snapshot, its ID is returned instead.
+    """
+    backend = backend or get_backend()
+    backup_dir = backup_dir or backend.backup_dir
+    os.makedirs(_snapshots_dir(backup_dir), exist_ok=True)
+    # The manifest is written under the lock too, so cleanup never sees its chunks unreferenced
+    with backend.lock():
+        snapshot_ids = _snapshot_ids(backup_dir)
+        latest = _read_manifest(backup_dir, snapshot_ids[-1]) if snapshot_ids else None
+        previous_files = {} if (latest is None or full) else latest["files"]
+
+        files = {}
+        for name, path in backend.backup_files().items():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entry = _chunk_file(backup_dir, path, stat, previous_files.get(name), name in APPEND_ONLY)
+            files[name] = {"path": path, **entry}
+
+        if latest is not None and _contents(latest["files"]) == _contents(files):
+            return latest["id"]
+
+        now = datetime.now()
+        manifest = {"id": now.strftime(SNAPSHOT_ID_FORMAT), "created": now.isoformat(timespec="seconds"), "files": files}
+        with atomic_write(_manifest_path(backup_dir, manifest["id"])) as f:
+            json.dump(manifest, f)
+        return manifest["id"]
+
+
+def _contents(files):
+    return {name: [digest for digest, _ in entry["chunks"]] for name, entry in files.items()}
+
+
+def list_backups(backup_dir=None, backend=None):
+    """Return [{id, created, files, size}] for every snapshot, newest first"""
+    backup_dir = backup_dir or (backend or get_backend()).backup_dir
+    backups = []
+    for snapshot_id in reversed(_snapshot_ids(backup_dir)):
+        manifest = _read_manifest(backup_dir, snapshot_id)
+        backups.append({
+            "id": manifest["id"],
+            "created": manifest["created"],
+            "files": sorted(manifest["files"]),
+            "size": sum(entry["size"] for entry in manifest["files"].values()),
+        })
+    return backups
+
+
+def restore_backup(snapshot_id, backend=None, backup_dir=None):
+    """Replace the backend's data files with their contents in a snapshot.
+
+    Files that didn't exist when the snapshot was taken are removed, so a
+    later change log isn't replayed onto the restored ledger.
+    """
+    backend = backend or get_backend()
+    backup_dir = backup_dir or backend.backup_dir
+    manifest = _read_manifest(backup_dir, snapshot_id)
+    with backend.lock():
+        paths = backend.backup_files()
+        for name, entry in manifest["files"].items():
+            paths.setdefault(name, entry["path"])  # e.g. a month partition deleted since the snapshot
+        for name, path in paths.items():
+            entry = manifest["files"].get(name)
+            if entry is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with atomic_write(path, "wb") as f:
+                for digest, _ in entry["chunks"]:
+                    f.write(_load_chunk(backup_dir, digest))
+        invalidate(backend, discard_hash_index=True)
+    return manifest
+
+
+def cleanup_old_backups(keep_days=30, backup_dir=None, backend=None):
+    """Remove snapshots older than ``keep_days`` (always keeping the latest) and unused chunks.
+
+    Holds the backend's lock like ``create_backup``, so chunks written by a
+    snapshot whose manifest isn't saved yet are never collected.
+    """
+    backend = backend or get_backend()
+    backup_dir = backup_dir or backend.backup_dir
+    cutoff_id = (datetime.now() - timedelta(days=keep_days)).strftime(SNAPSHOT_ID_FORMAT)
+    with backend.lock():
+        for snapshot_id in _snapshot_ids(backup_dir)[:-1]:
+            if snapshot_id < cutoff_id:
+                os.remove(_manifest_path(backup_dir, snapshot_id))
+
+        referenced = set()
+        for snapshot_id in _snapshot_ids(backup_dir):
+            for entry in _read_manifest(backup_dir, snapshot_id)["files"].values():
+                referenced.update(digest for digest, _ in entry["chunks"])
+        objects_dir = _objects_dir(backup_dir)
+        if not os.path.isdir(objects_dir):
+            return
+        for bucket in os.scandir(objects_dir):
+            for item in os.scandir(bucket.path):
+                if item.name not in referenced:
+                    os.remove(item.path)
@@ -0,0 +1,113 @@
+"""Plotly figures shown by the pages, built through the figure cache.
+
+Each function returns the cached figure for its page and parameters, so the
+refresh worker (refresh.py) can build exactly the figures a page will ask for
+before anyone opens it.
+"""
+import pandas as pd
+import plotly.express as px
+from config import CHART_MAX_POINTS, CHART_RANGES
+from .analytics import get_expenses_by_category, get_cash_flow, get_balance_series, get_budget_tracking
+from .downsample import downsample_series
+from .figures import cached_figure
+from .ledger import load_ledger, get_monthly_cube, query_transactions
+
+MONTH_ABBR = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+
+def home_expenses_pie(backend=None):
+    def build():
+        pie_data = get_expenses_by_category(backend)
+        pie_data["Amount"] = pd.to_numeric(pie_data["Amount"], errors="coerce")
+        fig = px.pie(pie_data, names="Category", values="Amount", title="💰 Expenses by Category", hole=0.4)
+        fig.update_layout(width=250, height=250, margin=dict(t=40, b=0, l=0, r=0))
+        return fig
+
+    return cached_figure("home", "expenses_by_category", build, backend=backend)
+
+
+def home_cash_flow(chart_range="All time", backend=None):
+    def build():
+        line_data = get_cash_flow(load_ledger(backend))
+        if CHART_RANGES[chart_range] is not None:
+            start = line_data["Date"].max() - pd.Timedelta(days=CHART_RANGES[chart_range])
+            line_data = line_data[line_data["Date"] > start]
+        line_data, granularity = downsample_series(line_data, max_points=CHART_MAX_POINTS)
+        fig = px.line(line_data, x="Date", y="Amount", labels={"Amount": f"Amount per {granularity}"})
+        fig.update_layout(title=dict(text="Cash Flow Over Time", font=dict(size=20, family='Arial'), x=0.5, xanchor='center'))
+        return fig
+
+    return cached_figure("home", "cash_flow", build, (chart_range,), backend=backend)
+
+
+def home_balance(chart_range="All time", backend=None):
+    def build():
+        line_data = get_balance_series(backend)
+        if CHART_RANGES[chart_range] is not None and not line_data.empty:
+            start = line_data["Date"].max() - pd.Timedelta(days=CHART_RANGES[chart_range])
+            line_data = line_data[line_data["Date"] > start]
+        line_data, _ = downsample_series(line_data, y="Balance", max_points=CHART_MAX_POINTS, how="last")
+        fig = px.line(line_data, x="Date", y="Balance")
+        fig.update_layout(title=dict(text="Balance Over Time", font=dict(size=20, family='Arial'), x=0.5, xanchor='center'))
+        return fig
+
+    return cached_figure("home", "balance", build, (chart_range,), backend=backend)
+
+
+def report_expenses_pie(year, month, backend=None):
+    def build():
+        expense_totals = get_monthly_cube(backend).category_totals(year, month, "Expense")
+        pie_data = pd.DataFrame(list(expense_totals.items()), columns=["Category", "Amount"])
+        return px.pie(pie_data, names="Category", values="Amount", title="Expenses by Category")
+
+    return cached_figure("report", "expenses_by_category", build, (year, month), backend=backend)
+
+
+def report_cash_flow(year, month, backend=None):
+    def build():
+        month_df = query_transactions(year=year, month=month, backend=backend)
+        line_data, granularity = downsample_series(get_cash_flow(month_df), max_points=CHART_MAX_POINTS)
+        return px.line(line_data, x="Date", y="Amount", title="Cash Flow Over Time",
+                       labels={"Amount": f"Amount per {granularity}"})
+
+    return cached_figure("report", "cash_flow", build, (year, month), backend=backend)
+
+
+def report_category_type(year, month, backend=None):
+    def build():
+        bar_data = get_monthly_cube(backend).category_type_frame(year, month)
+        return px.bar(bar_data, x="Category", y="Amount", color="Type", barmode="group",
+                      title="Income vs Expenses by Category")
+
+    return cached_figure("report", "category_type", build, (year, month), backend=backend)
+
+
+def report_monthly_type(year, backend=None):
+    def build():
+        monthly_summary = get_monthly_cube(backend).monthly_type_frame(year)
+        monthly_summary["Month"] = pd.Categorical(monthly_summary["Month"].map(lambda m: MONTH_ABBR[m - 1]),
+                                                  categories=MONTH_ABBR, ordered=True)
+        return px.bar(monthly_summary, x="Month", y="Amount", color="Type",
+                      barmode="group", title=f"📊 Monthly Income vs Expenses - {year}")
+
+    return cached_figure("report", "monthly_type", build, (year,), backend=backend)
+
+
+def budget_vs_spent(budgets, year, month, backend=None):
+    def build():
+        budget_df = get_budget_tracking(budgets, year, month, backend)
+        return px.bar(budget_df, x="Category", y=["Budget", "Spent"],
+                      title="Budget vs Spent by Category", barmode="group")
+
+    return cached_figure("budget", "budget_vs_spent", build, (year, month, tuple(sorted(budgets.items()))),
+                         backend=backend)
+
+
+def budget_progress(budgets, year, month, backend=None):
+    def build():
+        budget_df = get_budget_tracking(budgets, year, month, backend)
+        return px.bar(budget_df, x="Category", y="Progress", title="Budget Progress by Category (%)",
+                      color="Progress", color_continuous_scale=["green", "yellow", "red"])
+
+    return cached_figure("budget", "progress", build, (year, month, tuple(sorted(budgets.items()))),
+                         backend=backend)
@@ -0,0 +1,138 @@
+"""Compact typed representation of the ledger used for aggregation.
+
+The display frame keeps one Python object per string cell and float rupees.
+``CompactLedger`` stores the same transactions as plain numpy columns:
+
+- ``dates``: ``datetime64[D]``
+- ``signs``: ``int8`` type flag (+1 income, -1 expense, 0 anything else)
+- ``paise``: ``int64`` amounts in minor units, so sums are exact
+- ``category`` / ``description``: pandas Categoricals (integer codes plus a
+  single copy of each distinct label)
+
+Group-bys become ``np.bincount`` over integer codes.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+INCOME = 1
+EXPENSE = -1
+TYPE_LABELS = {INCOME: "Income", EXPENSE: "Expense", 0: "Other"}
+
+
+def to_paise(amounts):
+    """Convert rupee amounts to int64 paise"""
+    return np.rint(np.asarray(amounts, dtype="float64") * 100).astype("int64")
+
+
+def type_signs(types):
+    """Map Type labels to the int8 income/expense flag"""
+    types = np.asarray(types, dtype=object)
+    return np.select([types == "Income", types == "Expense"], [INCOME, EXPENSE], 0).astype("int8")
+
+
+def first_day_on_or_after(moment):
+    """First whole day not before ``moment`` (a cutoff with a time excludes its own day)"""
+    return np.datetime64(pd.Timestamp(moment).ceil("D"), "D")
+
+
+class CompactLedger:
+    """Column arrays with compact dtypes for fast, exact aggregation"""
+
+    def __init__(self, dates, signs, paise, category, description):
+        self.dates = dates
+        self.signs = signs
+        self.paise = paise
+        self.category = category
+        self.description = description
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(
+            df["Date"].to_numpy(dtype="datetime64[D]"),
+            type_signs(df["Type"]),
+            to_paise(df["Amount"]),
+            pd.Categorical(df["Category"]),
+            pd.Categorical(df["Description"]),
+        )
+
+    def __len__(self):
+        return len(self.paise)
+
+    def extended(self, df):
+        """Return a compact ledger that also holds the rows of ``df``"""
+        other = CompactLedger.from_frame(df)
+        return CompactLedger(
+            np.concatenate([self.dates, other.dates]),
+            np.concatenate([self.signs, other.signs]),
+            np.concatenate([self.paise, other.paise]),
+            union_categoricals([self.category, other.category]),
+            union_categoricals([self.description, other.description]),
+        )
+
+    def without(self, positions):
+        """Return a compact ledger without the rows at ``positions``"""
+        keep = np.ones(len(self), dtype=bool)
+        keep[positions] = False
+        return CompactLedger(
+            self.dates[keep], self.signs[keep], self.paise[keep], self.category[keep], self.description[keep]
+        )
+
+    def replaced(self, positions, df):
+        """Return a compact ledger with the rows at ``positions`` replaced by ``df``"""
+        other = CompactLedger.from_frame(df)
+
+        def assign(values, new_values):
+            values = values.copy()
+            values[positions] = new_values
+            return values
+
+        def assign_categorical(values, new_values):
+            missing = new_values.categories.difference(values.categories)
+            values = values.add_categories(missing) if len(missing) else values.copy()
+            values[positions] = np.asarray(new_values, dtype=object)
+            return values
+
+        return CompactLedger(
+            assign(self.dates, other.dates),
+            assign(self.signs, other.signs),
+            assign(self.paise, other.paise),
+            assign_categorical(self.category, other.category),
+            assign_categorical(self.description, other.description),
+        )
+
+    def memory_usage(self):
+        """Bytes held by the arrays, including one copy of each category label"""
+        def categorical_bytes(values):
+            return values.codes.nbytes + int(pd.Series(values.categories).memory_usage(deep=True, index=False))
+        return (
+            self.dates.nbytes + self.signs.nbytes + self.paise.nbytes
+            + categorical_bytes(self.category) + categorical_bytes(self.description)
+        )
+
+    def mask(self, entry_type=None, since=None):
+        """Boolean row mask by type sign and/or ``since`` cutoff"""
+        mask = np.ones(len(self), dtype=bool)
+        if entry_type is not None:
+            mask &= self.signs == entry_type
+        if since is not None:
+            mask &= self.dates >= first_day_on_or_after(since)
+        return mask
+
+    def total(self, mask=None):
+        """Sum of amounts in paise for the selected rows"""
+        return int(self.paise.sum() if mask is None else self.paise[mask].sum())
+
+    def balance(self):
+        """Income minus expenses, in paise"""
+        return int((self.paise * self.signs).sum())
+
+    def category_stats(self, mask=None):
+        """Return (labels, sum in paise, count) for categories with selected rows"""
+        codes = self.category.codes
+        selected = codes >= 0 if mask is None else mask & (codes >= 0)
+        size = len(self.category.categories)
+        sums = np.bincount(codes[selected], weights=self.paise[selected], minlength=size)
+        counts = np.bincount(codes[selected], minlength=size)
+        present = counts > 0
+        return self.category.categories[present], np.rint(sums[present]).astype("int64"), counts[present]
@@ -0,0 +1,114 @@
+"""Persistent content-hash index used to deduplicate imports.
+
+Each ledger row is reduced to a 64-bit hash of its normalized content (date
+as YYYY-MM-DD, type, amount rounded to paise, category and description with
+surrounding whitespace removed), so rows that differ only in date formatting
+or stray spaces hash the same. The hashes are kept in a multiset in memory
+and in a flat binary file next to the ledger; inserts append 8 bytes per row
+to it. Deletes only update memory and drop the file, which is rebuilt from
+the ledger the next time the index is loaded.
+"""
+import os
+import sys
+from collections import Counter
+import numpy as np
+import pandas as pd
+from config import DATE_FORMAT
+from .atomic import atomic_write
+
+
+def row_hashes(df):
+    """Return a uint64 content hash for every row of a ledger-shaped frame"""
+    if df.empty:
+        return np.empty(0, dtype="uint64")
+    normalized = pd.DataFrame({
+        "Date": pd.to_datetime(df["Date"], format="mixed", errors="coerce").dt.strftime(DATE_FORMAT),
+        "Type": df["Type"].astype(str).str.strip(),
+        "Amount": pd.to_numeric(df["Amount"], errors="coerce").round(2),
+        "Category": df["Category"].fillna("").astype(str).str.strip(),
+        "Description": df["Description"].fillna("").astype(str).str.strip(),
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+class HashIndex:
+    """Multiset of row hashes for one ledger, mirrored to an append-only file"""
+
+    def __init__(self, path, hashes):
+        self.path = path
+        self.count = len(hashes)
+        self._hashes = Counter(hashes.tolist())
+        self._persisted = True  # False once the file no longer mirrors memory
+
+    @classmethod
+    def load(cls, path, ledger_df):
+        """Load the index from disk, rebuilding it if it doesn't match the ledger"""
+        if os.path.exists(path):
+            hashes = np.fromfile(path, dtype="<u8")
+            if len(hashes) == len(ledger_df):
+                return cls(path, hashes)
+        hashes = row_hashes(ledger_df)
+        index = cls(path, hashes)
+        index._write(hashes)
+        return index
+
+    def _write(self, hashes):
+        with atomic_write(self.path, "wb") as f:
+            hashes.astype("<u8").tofile(f)
+        self._persisted = True
+
+    def __contains__(self, row_hash):
+        return row_hash in self._hashes
+
+    def __len__(self):
+        return self.count
+
+    def nbytes(self):
+        """Approximate memory of the in-memory multiset"""
+        return sys.getsizeof(self._hashes) + 36 * len(self._hashes)  # Plus one int object per distinct hash
+
+    def split_new(self, df):
+        """Return (is_new mask, hashes) for incoming rows.
+
+        A row is new if its hash is neither in the index nor earlier in ``df``.
+        Costs one set lookup per incoming row.
+        """
+        hashes = row_hashes(df)
+        seen = set()
+        is_new = np.empty(len(hashes), dtype=bool)
+        for i, row_hash in enumerate(hashes.tolist()):
+            is_new[i] = row_hash not in self._hashes and row_hash not in seen
+            seen.add(row_hash)
+        return is_new, hashes
+
+    def add(self, hashes):
+        """Record hashes of rows appended to the ledger"""
+        if len(hashes) == 0:
+            return
+        if self._persisted:
+            with open(self.path, "ab") as f:
+                hashes.astype("<u8").tofile(f)
+        self._hashes.update(hashes.tolist())
+        self.count += len(hashes)
+
+    def remove(self, hashes):
+        """Forget hashes of rows deleted from the ledger"""
+        if len(hashes) == 0:
+            return
+        for row_hash in hashes.tolist():
+            remaining = self._hashes[row_hash] - 1
+            if remaining > 0:
+                self._hashes[row_hash] = remaining
+            else:
+                del self._hashes[row_hash]
+        self.count -= len(hashes)
+        if self._persisted and os.path.exists(self.path):
+            os.remove(self.path)
+        self._persisted = False
+
+    def rebuild(self, ledger_df):
+        """Replace the index with the hashes of ``ledger_df`` (after deletes or rewrites)"""
+        hashes = row_hashes(ledger_df)
+        self._write(hashes)
+        self._hashes = Counter(hashes.tolist())
+        self.count = len(hashes)
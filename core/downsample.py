@@ -0,0 +1,62 @@
+"""Shrink long date series to a point budget before they are charted.
+
+``downsample_series`` keeps daily points while they fit in the budget and
+otherwise buckets them into weeks or months, combining values with ``how``
+("sum" for flows such as cash flow, "last" for levels such as a balance).
+If even monthly buckets don't fit, the monthly series is thinned with
+Largest-Triangle-Three-Buckets, which keeps the peaks and troughs that give a
+line its shape.
+"""
+import numpy as np
+
+GRANULARITIES = [("day", None), ("week", "W-MON"), ("month", "MS")]
+
+
+def lttb(x, y, points):
+    """Return the indices of ``points`` samples of (x, y) chosen by LTTB"""
+    size = len(y)
+    if points >= size or points < 3:
+        return np.arange(size) if points >= size else np.linspace(0, size - 1, max(points, 0)).astype(int)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # The first and last points are always kept; the rest fall into points - 2 buckets
+    edges = np.linspace(1, size - 1, points - 1).astype(int)
+    selected = np.empty(points, dtype=int)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        # Pick the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_series(df, x="Date", y="Amount", max_points=500, how="sum"):
+    """Return ``(frame, granularity)`` with at most ``max_points`` rows.
+
+    ``granularity`` is "day", "week" or "month" and describes what each point
+    covers, so charts can label their axis ("Amount per week").
+    """
+    if df.empty:
+        return df, "day"
+    series = df.set_index(x)[y].sort_index()
+    for granularity, rule in GRANULARITIES:
+        if rule is None:
+            resampled = series.groupby(level=0).agg(how) if series.index.has_duplicates else series
+        else:
+            resampled = series.resample(rule, label="left", closed="left").agg(how)
+            if how != "sum":
+                resampled = resampled.ffill()  # Carry a level through buckets without rows
+        if len(resampled) <= max_points:
+            return resampled.reset_index(), granularity
+
+    keep = lttb(resampled.index.to_numpy(dtype="datetime64[D]").astype("int64"), resampled.to_numpy(), max_points)
+    return resampled.iloc[keep].reset_index(), granularity
@@ -0,0 +1,76 @@
+"""Process-wide LRU cache of built Plotly figures.
+
+Building a figure with plotly.express takes tens of milliseconds per chart,
+and Streamlit reruns the whole page on every widget change. Figures are keyed
+on (backend, its ledger version, page, chart id, parameters), so a write to
+one user's ledger makes only that user's old entries unreachable and they age
+out of the LRU.
+
+Cached figures are shared between sessions: pass them to ``st.plotly_chart``
+as they are and don't modify them.
+"""
+import threading
+from collections import OrderedDict
+from config import FIGURE_CACHE_SIZE
+from .ledger import load_ledger, ledger_version
+from .storage import get_backend
+
+
+class FigureCache:
+    """Least-recently-used mapping of keys to figures, holding at most ``max_entries``"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        """Return the figure cached for ``key``, calling ``build()`` on a miss"""
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+
+        figure = build()
+        with self._lock:
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_figures = FigureCache(FIGURE_CACHE_SIZE)
+
+
+def cached_figure(page, chart_id, build, params=(), backend=None):
+    """Return ``build()``, reusing the figure built for the same ledger version and ``params``.
+
+    ``params`` must be hashable and cover every input of the chart besides the
+    ledger itself, e.g. the selected filters or the budgets being plotted.
+    """
+    backend = backend or get_backend()
+    load_ledger(backend)  # Notice writes by other processes before reading the version
+    return _figures.get((backend.key, ledger_version(backend), page, chart_id, params), build)
+
+
+def figure_cache_stats():
+    """Entries, capacity, hits and misses of the figure cache"""
+    return {
+        "entries": len(_figures),
+        "max_entries": _figures.max_entries,
+        "hits": _figures.hits,
+        "misses": _figures.misses,
+    }
@@ -0,0 +1,115 @@
+"""Chunked CSV import into the ledger.
+
+Uploaded bank exports can be hundreds of MB, so they are never loaded whole:
+the file is read ``IMPORT_CHUNK_SIZE`` rows at a time, each chunk is cleaned
+with the same rules the import page has always applied, and the valid rows are
+appended to the ledger before the next chunk is read. Peak memory for the
+upload is therefore bounded by the chunk size.
+
+Duplicates are detected against the ledger's persistent content-hash index
+(see dedup.py), so the check costs one lookup per incoming row.
+"""
+import pandas as pd
+from config import IMPORT_CHUNK_SIZE
+from .ledger import append_transactions, get_hash_index
+from .validation import valid_dates
+
+REQUIRED_COLUMNS = ["Date", "Type", "Category", "Amount"]
+VALID_TYPES = ["Income", "Expense"]
+DUPLICATE_SAMPLE_ROWS = 100  # Skipped duplicates kept in the report for display
+
+
+def missing_columns(columns):
+    """Return the required import columns that are absent from ``columns``"""
+    return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+
+def clean_chunk(chunk, report):
+    """Drop invalid rows from one chunk, counting each reason in ``report``"""
+    chunk = chunk.copy()
+    chunk["Date"] = pd.to_datetime(chunk["Date"], format="mixed", errors="coerce").dt.normalize()
+    invalid_dates = ~valid_dates(chunk["Date"])  # Unparseable or outside what the ledger can hold
+    report["invalid_dates"] += int(invalid_dates.sum())
+    chunk = chunk[~invalid_dates]
+
+    chunk["Amount"] = pd.to_numeric(chunk["Amount"], errors="coerce")
+    invalid_amounts = chunk["Amount"].isna()
+    report["invalid_amounts"] += int(invalid_amounts.sum())
+    chunk = chunk[~invalid_amounts]
+
+    zero_amounts = chunk["Amount"] == 0
+    report["zero_amounts"] += int(zero_amounts.sum())
+    chunk = chunk[~zero_amounts]
+
+    invalid_types = ~chunk["Type"].isin(VALID_TYPES)
+    report["invalid_types"] += int(invalid_types.sum())
+    chunk = chunk[~invalid_types]
+
+    empty_categories = chunk["Category"].isna() | (chunk["Category"] == "")
+    report["empty_categories"] += int(empty_categories.sum())
+    chunk = chunk[~empty_categories]
+
+    if "Description" not in chunk.columns:
+        chunk["Description"] = None
+    return chunk
+
+
+def summarize_csv(source, chunk_size=IMPORT_CHUNK_SIZE):
+    """Row count, total amount and income/expense counts of an upload, read in chunks"""
+    summary = {"rows": 0, "amount": 0.0, "income": 0, "expense": 0}
+    for chunk in pd.read_csv(source, chunksize=chunk_size, usecols=["Type", "Amount"]):
+        summary["rows"] += len(chunk)
+        summary["amount"] += float(pd.to_numeric(chunk["Amount"], errors="coerce").sum())
+        summary["income"] += int((chunk["Type"] == "Income").sum())
+        summary["expense"] += int((chunk["Type"] == "Expense").sum())
+    return summary
+
+
+def import_csv(source, chunk_size=IMPORT_CHUNK_SIZE, progress=None, backend=None):
+    """Stream a CSV upload into the ledger and return a report of what happened.
+
+    ``progress`` is called with the running report after every chunk is
+    committed. Rows whose normalized content matches one already in the
+    ledger (or earlier in the upload) are skipped and counted as duplicates;
+    the first ``DUPLICATE_SAMPLE_ROWS`` of them are listed in
+    ``report["duplicate_rows"]`` with their line number in the upload.
+    """
+    report = {
+        "rows_read": 0,
+        "invalid_dates": 0,
+        "invalid_amounts": 0,
+        "zero_amounts": 0,
+        "invalid_types": 0,
+        "empty_categories": 0,
+        "duplicates": 0,
+        "duplicate_rows": [],
+        "imported": 0,
+    }
+    index = get_hash_index(backend)
+
+    for chunk in pd.read_csv(source, chunksize=chunk_size):
+        missing = missing_columns(chunk.columns)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        first_line = report["rows_read"] + 2  # Header is line 1
+        report["rows_read"] += len(chunk)
+        cleaned = clean_chunk(chunk, report)
+
+        is_new, _ = index.split_new(cleaned)
+        fresh = cleaned[is_new]
+        duplicates = cleaned[~is_new]
+        report["duplicates"] += len(duplicates)
+
+        room = DUPLICATE_SAMPLE_ROWS - len(report["duplicate_rows"])
+        if room > 0 and not duplicates.empty:
+            sample = duplicates.head(room)
+            sample = sample.assign(Line=sample.index - chunk.index[0] + first_line)
+            report["duplicate_rows"].extend(sample.to_dict("records"))
+
+        if not fresh.empty:
+            append_transactions(fresh, backend=backend)
+            report["imported"] += len(fresh)
+        if progress is not None:
+            progress(report)
+    return report
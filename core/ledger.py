@@ -0,0 +1,513 @@
+"""Shared access to the transaction ledger.
+
+Every page reads and writes transactions through this module. The parsed
+DataFrame is cached in-process and only re-loaded when the underlying storage
+changes (modification time or size of the file), so Streamlit reruns that
+don't touch the data cost a single ``os.stat`` instead of a full parse.
+
+The actual I/O is done by the backend selected in config.py (see storage.py).
+Derived data such as the compact typed columns (compact.py), the monthly
+aggregate cube, the daily per-category running sums and the sorted date index
+lives next to the cached frame and is patched by the same writes that extend
+it. The spending statistics are instead rebuilt from the cube on first use
+after each write.
+
+The persistent content-hash index used to deduplicate imports (dedup.py) is
+also kept here so every insert path records the hashes of the rows it adds.
+
+Transactions are addressed by their persistent ``ID``. Writes hold the
+backend's lock, which serializes them across sessions and processes, and
+once the backend's change log passes
+``LEDGER_COMPACT_THRESHOLD`` records it is compacted on a background thread.
+
+Listeners registered with ``add_listener`` are told about every write; the
+refresh worker (refresh.py) uses this to rebuild derived data ahead of time.
+
+Each backend (one per user, see storage.py) has its own cache entry. Entries
+are kept in least-recently-used order and the coldest are dropped, together
+with their hash indexes, once their approximate memory passes
+``LEDGER_CACHE_MAX_BYTES``; a dropped user's next page load re-reads storage.
+Versions are counted per backend, and derived structures are built under
+their entry's own lock, so one user's writes and cold rebuilds don't hold up
+the others.
+
+The cached frame is shared between pages and sessions: treat it as read-only
+and work on a copy (or a filtered slice) before modifying it.
+"""
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .aggregates import MonthlyCube, DailySums, SpendingStats, DateIndex
+from .compact import CompactLedger
+from .atomic import ConflictError
+from .dedup import HashIndex, row_hashes
+from .storage import (
+    ID_COLUMN, LEDGER_COLUMNS, normalize_rows, filter_transactions, get_backend
+)
+from config import LEDGER_COMPACT_THRESHOLD, LEDGER_CACHE_MAX_BYTES
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # backend key -> _LedgerEntry, least recently used first
+_hash_indexes = {}  # backend key -> HashIndex
+_hash_index_locks = {}  # backend key -> Lock held while its hash index is loaded
+_compacting = set()  # backend keys with a compaction running
+_versions = {}  # backend key -> counter bumped on every reload or write
+_listeners = []  # Callables notified with the backend after every write
+
+
+class _LedgerEntry:
+    """Cached frame plus lazily built aggregates for one storage signature"""
+
+    def __init__(self, signature, frame, row_bytes=None):
+        self.signature = signature
+        self.frame = frame
+        self.compact = None
+        self.cube = None
+        self.daily = None
+        self.spending = None
+        self.date_index = None
+        self.row_bytes = row_bytes  # Measured once per load and carried over by patches
+        self.build_lock = threading.Lock()  # Held while a derived structure is built
+
+    def nbytes(self):
+        """Approximate memory held by the frame and the derived arrays built so far"""
+        if self.row_bytes is None:
+            self.row_bytes = self.frame.memory_usage(deep=True).sum() / max(len(self.frame), 1)
+        total = self.row_bytes * len(self.frame)
+        if self.compact is not None:
+            compact = self.compact
+            total += (compact.dates.nbytes + compact.signs.nbytes + compact.paise.nbytes
+                      + compact.category.codes.nbytes + compact.description.codes.nbytes)
+        if self.daily is not None:
+            total += self.daily.nbytes()
+        if self.spending is not None:
+            total += self.spending.nbytes()
+        if self.date_index is not None:
+            total += self.date_index.order.nbytes + self.date_index.sorted_dates.nbytes
+        return int(total)
+
+    def patched(self, signature, frame):
+        """New entry for a modified frame, keeping this entry's per-row size estimate"""
+        return _LedgerEntry(signature, frame, self.row_bytes)
+
+
+def _bump_version(key):
+    """Mark ``key``'s ledger as changed; call with ``_lock`` held"""
+    _versions[key] = _versions.get(key, 0) + 1
+
+
+def add_listener(callback):
+    """Call ``callback(backend)`` after every write to a ledger and on ``invalidate``.
+
+    Callbacks run on the writing thread, so they should only hand the work off.
+    """
+    _listeners.append(callback)
+
+
+def _notify(backend):
+    for callback in list(_listeners):
+        callback(backend)
+
+
+def _store(key, entry):
+    """Cache ``entry`` as the most recently used ledger; call with ``_lock`` held"""
+    _cache[key] = entry
+    _cache.move_to_end(key)
+    _evict_cold(key)
+
+
+def _evict_cold(keep):
+    """Drop least recently used ledgers and their hash indexes, except ``keep``, beyond the limit"""
+    total = _memory_usage()
+    orphaned = [key for key in _hash_indexes if key not in _cache]  # Coldest: their ledger is gone
+    for cold_key in orphaned + list(_cache):
+        if total <= LEDGER_CACHE_MAX_BYTES:
+            break
+        if cold_key == keep:
+            continue
+        entry = _cache.pop(cold_key, None)
+        if entry is not None:
+            total -= entry.nbytes()
+        index = _hash_indexes.pop(cold_key, None)
+        if index is not None:
+            total -= index.nbytes()
+
+
+def _memory_usage():
+    return (sum(entry.nbytes() for entry in _cache.values())
+            + sum(index.nbytes() for index in _hash_indexes.values()))
+
+
+def cache_stats():
+    """Number of cached ledgers and their approximate memory against LEDGER_CACHE_MAX_BYTES"""
+    with _lock:
+        return {"ledgers": len(_cache), "bytes": _memory_usage(), "max_bytes": LEDGER_CACHE_MAX_BYTES}
+
+
+def _current_entry(backend):
+    """Return the cache entry for the backend, re-loading storage if it changed"""
+    signature = backend.signature()
+    with _lock:
+        entry = _cache.get(backend.key)
+        if entry is not None and entry.signature == signature:
+            _cache.move_to_end(backend.key)
+            return entry
+
+    entry = _LedgerEntry(signature, backend.load_transactions())
+    with _lock:
+        _store(backend.key, entry)
+        _bump_version(backend.key)
+    return entry
+
+
+def load_ledger(backend=None):
+    """Return the parsed ledger, re-reading storage only when it changed"""
+    return _current_entry(backend or get_backend()).frame
+
+
+def _derived(entry, name, build):
+    """Return ``entry.<name>``, calling ``build()`` the first time.
+
+    Builds hold the entry's own lock rather than ``_lock``, so a cold rebuild
+    for one user doesn't stall cache lookups and writes of the others.
+    """
+    value = getattr(entry, name)
+    if value is None:
+        with entry.build_lock:
+            value = getattr(entry, name)
+            if value is None:
+                value = build()
+                setattr(entry, name, value)
+    return value
+
+
+def _compact(entry):
+    return _derived(entry, "compact", lambda: CompactLedger.from_frame(entry.frame))
+
+
+def get_compact_ledger(backend=None):
+    """Return the ledger as compact typed columns for aggregation"""
+    return _compact(_current_entry(backend or get_backend()))
+
+
+def _cube(entry):
+    compact = _compact(entry)
+    return _derived(entry, "cube", lambda: MonthlyCube.from_compact(compact))
+
+
+def get_monthly_cube(backend=None):
+    """Return the (year, month, type, category) aggregate cube for the ledger"""
+    return _cube(_current_entry(backend or get_backend()))
+
+
+def get_daily_sums(backend=None):
+    """Return the per-day, per-category running sums used for trailing-window queries"""
+    entry = _current_entry(backend or get_backend())
+    compact = _compact(entry)
+    return _derived(entry, "daily", lambda: DailySums.from_compact(compact))
+
+
+def get_spending_stats(backend=None):
+    """Return per-category monthly spending statistics, derived from the cube"""
+    entry = _current_entry(backend or get_backend())
+    cube = _cube(entry)
+    return _derived(entry, "spending", lambda: SpendingStats.from_cube(cube))
+
+
+def _date_index(entry):
+    return _derived(entry, "date_index", lambda: DateIndex.from_ledger(entry.frame))
+
+
+def get_hash_index(backend=None):
+    """Return the content-hash index for the ledger, loading or rebuilding it once"""
+    backend = backend or get_backend()
+    frame = load_ledger(backend)
+    with _lock:
+        lock = _hash_index_locks.setdefault(backend.key, threading.Lock())
+    with lock:  # Loading hashes the whole ledger, so other users' lookups mustn't wait on it
+        with _lock:
+            index = _hash_indexes.get(backend.key)
+        if index is None or len(index) != len(frame):
+            index = HashIndex.load(backend.hash_index_file, frame)
+            with _lock:
+                _hash_indexes[backend.key] = index
+                _evict_cold(backend.key)
+        return index
+
+
+def _discard_hash_index(backend):
+    """Forget the hash index after a full rewrite; it is rebuilt on next use"""
+    with _lock:
+        _hash_indexes.pop(backend.key, None)
+        if os.path.exists(backend.hash_index_file):
+            os.remove(backend.hash_index_file)
+
+
+def query_date_range(start, end, descending=False, backend=None):
+    """Return transactions dated from ``start`` to ``end`` (both days inclusive).
+
+    Uses the sorted date index, so the cost is a binary search plus the rows
+    returned rather than a scan of the whole ledger.
+    """
+    entry = _current_entry(backend or get_backend())
+    positions = _range_positions(entry, start, end)
+    if descending:
+        positions = positions[::-1]
+    return entry.frame.iloc[positions]
+
+
+def _range_positions(entry, start, end):
+    start = pd.Timestamp(start).normalize().to_datetime64()
+    end = (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_datetime64()
+    return _date_index(entry).positions(start, end)
+
+
+def count_date_range(start, end, backend=None):
+    """Number of transactions dated from ``start`` to ``end`` (both days inclusive)"""
+    return len(_range_positions(_current_entry(backend or get_backend()), start, end))
+
+
+def query_date_range_page(start, end, page=0, page_size=50, sort_by="Date",
+                          descending=True, backend=None):
+    """Return one page of the transactions dated ``start`` to ``end`` and the total count.
+
+    Rows are ordered by ``sort_by`` ("Date" or "Amount") and only the
+    ``page_size`` rows of the requested page are taken from the ledger, so
+    the cost of showing a page doesn't grow with the size of the range.
+    """
+    entry = _current_entry(backend or get_backend())
+    positions = _range_positions(entry, start, end)
+    if sort_by == "Amount":
+        amounts = _compact(entry).paise[positions]
+        positions = positions[np.argsort(amounts, kind="stable")]
+    elif sort_by != "Date":
+        raise ValueError(f"Unsupported sort column: {sort_by}")
+    if descending:
+        positions = positions[::-1]
+    first = page * page_size
+    return entry.frame.iloc[positions[first:first + page_size]], len(positions)
+
+
+def query_transactions(year=None, month=None, category=None, entry_type=None, backend=None):
+    """Return transactions for a year/month, category and/or type.
+
+    Indexed backends answer the query directly; otherwise the filters are
+    applied to the cached ledger.
+    """
+    backend = backend or get_backend()
+    if backend.indexed:
+        return backend.query_transactions(year, month, category, entry_type)
+    return filter_transactions(load_ledger(backend), year, month, category, entry_type)
+
+
+def save_ledger(df, base=None, backend=None):
+    """Write the full ledger to storage and invalidate the cached copy.
+
+    ``base`` is the ledger frame the edit started from; if storage has changed
+    since it was loaded, ConflictError is raised instead of overwriting.
+    """
+    backend = backend or get_backend()
+    with backend.lock():
+        if base is not None and _current_entry(backend).frame is not base:
+            raise ConflictError("The ledger was changed by another session")
+        backend.save_transactions(df)
+        _discard_hash_index(backend)
+        invalidate(backend)
+
+
+def append_transactions(rows, backend=None):
+    """Append new transactions to the ledger without rewriting existing rows.
+
+    Only the new records are written, so the cost of an insert doesn't depend
+    on the size of the ledger. If the cached frame was current before the
+    write it is extended (and its aggregates patched) instead of re-loaded.
+    Returns the new rows with their assigned IDs.
+    """
+    backend = backend or get_backend()
+    new_rows = normalize_rows(rows)
+    if new_rows.empty:
+        return new_rows
+
+    with backend.lock():
+        before = backend.signature()
+        new_rows = backend.append_transactions(new_rows)
+        after = backend.signature()
+
+        with _lock:
+            entry = _cache.get(backend.key)
+            if entry is not None and entry.signature == before:
+                frame = entry.frame
+                new_rows = new_rows.astype(frame.dtypes.to_dict())
+                updated = entry.patched(after, pd.concat([frame, new_rows], ignore_index=True))
+                if entry.compact is not None:
+                    updated.compact = entry.compact.extended(new_rows)
+                if entry.cube is not None:
+                    updated.cube = entry.cube.copy()
+                    updated.cube.add(new_rows)
+                if entry.daily is not None:
+                    updated.daily = entry.daily.added(new_rows)
+                if entry.date_index is not None:
+                    updated.date_index = entry.date_index.extended(new_rows["Date"], len(frame))
+                _store(backend.key, updated)
+            else:
+                _cache.pop(backend.key, None)
+            index = _hash_indexes.get(backend.key)
+            _bump_version(backend.key)
+        if index is not None:
+            index.add(row_hashes(new_rows))
+    _notify(backend)
+    return new_rows
+
+
+def delete_transactions(ids, backend=None):
+    """Delete transactions by ID and patch the cached ledger and aggregates.
+
+    Storage only records the deletion (a tombstone for CSV), so the cost does
+    not depend on the size of the ledger. Returns the removed rows.
+    """
+    backend = backend or get_backend()
+    with backend.lock():
+        entry = _current_entry(backend)
+        positions = np.flatnonzero(entry.frame[ID_COLUMN].isin(list(ids)).to_numpy())
+        removed = entry.frame.iloc[positions]
+        if removed.empty:
+            return removed
+        remaining = entry.frame.drop(index=removed.index).reset_index(drop=True)
+
+        before = backend.signature()
+        backend.delete_transactions(removed[ID_COLUMN].tolist(), removed["Date"])
+        after = backend.signature()
+
+        with _lock:
+            if _cache.get(backend.key) is entry and entry.signature == before:
+                updated = entry.patched(after, remaining)
+                if entry.compact is not None:
+                    updated.compact = entry.compact.without(positions)
+                if entry.cube is not None:
+                    updated.cube = entry.cube.copy()
+                    updated.cube.remove(removed)
+                if entry.daily is not None:
+                    updated.daily = entry.daily.added(removed, sign=-1)
+                if entry.date_index is not None:
+                    updated.date_index = entry.date_index.without(positions, len(entry.frame))
+                _store(backend.key, updated)
+            else:
+                _cache.pop(backend.key, None)
+            index = _hash_indexes.get(backend.key)
+            _bump_version(backend.key)
+        if index is not None:
+            index.remove(row_hashes(removed))
+    _notify(backend)
+    _schedule_compaction(backend)
+    return removed
+
+
+def update_transaction(transaction_id, values, backend=None):
+    """Change fields of one transaction and patch the cached aggregates by the difference.
+
+    ``values`` maps any of Date, Type, Amount, Category and Description to the
+    new value. Only that record is written (an update record for CSV), and the
+    cube, compact columns, date index and hash index swap the old row for the
+    new one instead of being rebuilt. Returns the updated row.
+    """
+    backend = backend or get_backend()
+    with backend.lock():
+        entry = _current_entry(backend)
+        frame = entry.frame
+        positions = np.flatnonzero((frame[ID_COLUMN] == transaction_id).to_numpy())
+        if len(positions) == 0:
+            raise KeyError(f"No transaction with ID {transaction_id}")
+        old = frame.iloc[positions]
+        new = normalize_rows([{**old.iloc[0][LEDGER_COLUMNS].to_dict(), **values}])
+        new.insert(0, ID_COLUMN, old[ID_COLUMN].to_numpy())
+        new = new.astype(frame.dtypes.to_dict()).set_axis(old.index)
+
+        before = backend.signature()
+        backend.update_transactions(new, old["Date"])
+        after = backend.signature()
+
+        with _lock:
+            if _cache.get(backend.key) is entry and entry.signature == before:
+                frame = frame.copy()
+                for column in LEDGER_COLUMNS:
+                    # Setting a cell copies the whole column, so skip unchanged ones
+                    if not old[column].equals(new[column]):
+                        frame.loc[old.index, column] = new[column].to_numpy()
+                updated = entry.patched(after, frame)
+                if entry.compact is not None:
+                    updated.compact = entry.compact.replaced(positions, new)
+                if entry.cube is not None:
+                    updated.cube = entry.cube.copy()
+                    updated.cube.remove(old)
+                    updated.cube.add(new)
+                if entry.daily is not None:
+                    updated.daily = entry.daily.added(old, sign=-1).added(new)
+                if entry.date_index is not None:
+                    updated.date_index = entry.date_index.replaced(positions, new["Date"])
+                _store(backend.key, updated)
+            else:
+                _cache.pop(backend.key, None)
+            index = _hash_indexes.get(backend.key)
+            _bump_version(backend.key)
+        if index is not None:
+            index.remove(row_hashes(old))
+            index.add(row_hashes(new))
+    _notify(backend)
+    _schedule_compaction(backend)
+    return new
+
+
+def compact_ledger(backend=None):
+    """Fold pending deletes/edits into the ledger file, keeping the cache current"""
+    backend = backend or get_backend()
+    with backend.lock():
+        before = backend.signature()
+        with _lock:
+            entry = _cache.get(backend.key)
+        current = entry is not None and entry.signature == before
+        backend.compact_transactions(entry.frame if current else None)
+        if current:
+            with _lock:
+                if _cache.get(backend.key) is entry:
+                    entry.signature = backend.signature()  # Same rows, new files
+
+
+def _schedule_compaction(backend):
+    """Compact on a background thread once the change log passes the threshold"""
+    if backend.pending_changes() < LEDGER_COMPACT_THRESHOLD:
+        return
+    with _lock:
+        if backend.key in _compacting:
+            return
+        _compacting.add(backend.key)
+
+    def run():
+        try:
+            compact_ledger(backend)
+        finally:
+            with _lock:
+                _compacting.discard(backend.key)
+
+    threading.Thread(target=run, name="ledger-compaction", daemon=True).start()
+
+
+def invalidate(backend=None, discard_hash_index=False):
+    """Drop the cached ledger so the next load re-reads storage.
+
+    Pass ``discard_hash_index=True`` when the files were replaced from outside
+    (e.g. a restored backup) so the hash index is rebuilt as well.
+    """
+    backend = backend or get_backend()
+    if discard_hash_index:
+        _discard_hash_index(backend)
+    with _lock:
+        _cache.pop(backend.key, None)
+        _bump_version(backend.key)
+    _notify(backend)
+
+
+def ledger_version(backend=None):
+    """Counter that changes whenever ``backend``'s cached ledger is reloaded or written"""
+    return _versions.get((backend or get_backend()).key, 0)
@@ -0,0 +1,144 @@
+"""Background refresh of aggregates and chart figures after ledger writes.
+
+Writes patch the cached ledger, but the next page view still pays for
+anything that has to be rebuilt: the whole ledger after ``invalidate`` (full
+saves, restores), and every chart figure after a version change. The refresh
+worker listens for ledger writes and does that work on a thread pool, so page
+loads find it ready.
+
+Bursts of writes are coalesced: while a refresh for a backend is queued, more
+writes to it don't queue another one, and a refresh that is running when a
+write arrives is followed by exactly one more.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import REFRESH_WORKERS, REFRESH_DELAY
+from . import charts
+from .analytics import get_overview_totals
+from .ledger import (
+    add_listener, load_ledger, get_compact_ledger, get_monthly_cube, get_daily_sums, get_spending_stats,
+    count_date_range
+)
+
+
+def warm(backend):
+    """Rebuild the aggregates and the default views of every page for ``backend``"""
+    df = load_ledger(backend)
+    get_compact_ledger(backend)
+    cube = get_monthly_cube(backend)
+    get_daily_sums(backend)
+    get_spending_stats(backend)
+    get_overview_totals(backend)
+    if df.empty:
+        return
+    count_date_range(df["Date"].min(), df["Date"].max(), backend=backend)  # Builds the date index
+
+    # The views pages open with: latest year, January, all-time cash flow
+    year = cube.years()[-1]
+    charts.home_expenses_pie(backend)
+    charts.home_cash_flow(backend=backend)
+    charts.home_balance(backend=backend)
+    charts.report_expenses_pie(year, 1, backend)
+    charts.report_cash_flow(year, 1, backend)
+    charts.report_category_type(year, 1, backend)
+    charts.report_monthly_type(year, backend)
+    budgets = backend.load_budgets()
+    if budgets:
+        charts.budget_vs_spent(budgets, year, 1, backend)
+        charts.budget_progress(budgets, year, 1, backend)
+
+
+class RefreshWorker:
+    """Runs ``refresh(backend)`` on a thread pool after writes, coalescing bursts"""
+
+    def __init__(self, refresh=warm, max_workers=REFRESH_WORKERS, delay=REFRESH_DELAY):
+        self.refresh = refresh
+        self.delay = delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ledger-refresh")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = {}  # backend key -> backend, waiting for a refresh
+        self._running = set()  # backend keys being refreshed
+        self.refreshes = 0
+        self.coalesced = 0
+        self.last_latency = None
+        self.last_refresh = None
+        self.last_error = None
+
+    def notify(self, backend):
+        """Schedule a refresh of ``backend`` unless one is already waiting"""
+        with self._lock:
+            if backend.key in self._pending:
+                self.coalesced += 1
+                return
+            self._pending[backend.key] = backend
+            if backend.key in self._running:
+                return  # The running refresh picks it up when it finishes
+        self._executor.submit(self._run, backend.key)
+
+    def _run(self, key):
+        time.sleep(self.delay)  # Let a burst of writes settle first
+        while True:
+            with self._lock:
+                backend = self._pending.pop(key, None)
+                if backend is None:
+                    self._running.discard(key)
+                    self._idle.notify_all()
+                    return
+                self._running.add(key)
+            start = time.perf_counter()
+            try:
+                self.refresh(backend)
+                self.last_error = None
+            except Exception as exc:
+                self.last_error = repr(exc)
+            with self._lock:
+                self.refreshes += 1
+                self.last_latency = time.perf_counter() - start
+                self.last_refresh = datetime.now()
+
+    def queue_depth(self):
+        """Number of backends waiting for a refresh"""
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "running": len(self._running),
+                "refreshes": self.refreshes,
+                "coalesced": self.coalesced,
+                "last_latency": self.last_latency,
+                "last_refresh": self.last_refresh,
+                "last_error": self.last_error,
+            }
+
+    def wait(self, timeout=None):
+        """Block until no refresh is queued or running; return False on timeout"""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_refresh_worker():
+    """Start the process-wide refresh worker once and return it"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = RefreshWorker()
+            add_listener(_worker.notify)
+        return _worker
+
+
+def refresh_stats():
+    """Queue depth and last-refresh latency of the worker, or None if it isn't running"""
+    return _worker.stats() if _worker is not None else None
@@ -0,0 +1,950 @@
+"""Storage backends for transactions, goals and budgets.
+
+Every transaction carries a persistent integer ``ID`` assigned when it is
+first written, so rows keep their identity across reloads and sessions.
+
+CSV files are the default. Inserts are appended to the ledger file; deletes
+and edits are appended as tombstone/update records to a separate change log
+that is replayed on load, and folded back into the ledger file by
+``compact_transactions`` once it grows past ``LEDGER_COMPACT_THRESHOLD``.
+
+Writes go through the backend's ``lock()`` (see atomic.py), and files are
+only ever rewritten via temp file + fsync + rename. Appends are fsynced and
+rolled back if they fail part-way. Set ``STORAGE_BACKEND = "sqlite"`` in config.py to
+keep everything in a single SQLite database with indexes on date, type and
+category, so month/year/category filters run as SQL instead of scanning the
+whole ledger. Copy existing CSV data into the database once with:
+
+    python -m core migrate
+
+``STORAGE_BACKEND = "parquet"`` (with the optional pyarrow package) keeps
+transactions in one Parquet file per month under ``LEDGER_DIR``, so reads of
+a month or year open only those partitions; migrate with
+``python -m core migrate --to parquet``.
+
+When a user is set with ``set_current_user`` (main.py does this on every
+run), ``get_backend`` returns that user's backend, whose files and backups
+live in their own directory under ``USERS_DIR``. Without a user the shared
+files in ``DATA_DIR`` are used.
+"""
+import contextvars
+import json
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from contextlib import contextmanager
+import pandas as pd
+from pandas.errors import EmptyDataError
+try:
+    import pyarrow  # Optional: only the partitioned (parquet) backend needs it
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+from .atomic import FileLock, ConflictError, atomic_write
+from .validation import valid_dates
+from config import (
+    EXPENSE_FILE, GOALS_FILE, BUDGETS_FILE, DATABASE_FILE, HASH_INDEX_FILE, CHANGES_FILE, LEDGER_DIR, BACKUP_DIR,
+    USERS_DIR, STORAGE_BACKEND, DATE_FORMAT
+)
+
+ID_COLUMN = "ID"
+LEDGER_COLUMNS = ["Date", "Type", "Amount", "Category", "Description"]
+STORED_COLUMNS = [ID_COLUMN] + LEDGER_COLUMNS
+CHANGE_COLUMNS = ["Op", ID_COLUMN] + LEDGER_COLUMNS
+GOALS_COLUMNS = ["Goal", "Target Amount", "Amount Saved", "Deadline"]
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.@+-]{0,127}")
+
+
+def empty_ledger():
+    """Return an empty ledger with the expected columns and dtypes"""
+    return pd.DataFrame({
+        ID_COLUMN: pd.Series(dtype="int64"),
+        "Date": pd.Series(dtype="datetime64[ns]"),
+        "Type": pd.Series(dtype="object"),
+        "Amount": pd.Series(dtype="float64"),
+        "Category": pd.Series(dtype="object"),
+        "Description": pd.Series(dtype="object"),
+    })
+
+
+def empty_goals():
+    """Return an empty goals table"""
+    return pd.DataFrame(columns=GOALS_COLUMNS)
+
+
+def file_signature(path):
+    """Return a cheap fingerprint of the file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def normalize_rows(rows):
+    """Coerce new entries into ledger columns with day-resolution dates"""
+    df = pd.DataFrame(rows).reindex(columns=LEDGER_COLUMNS)
+    df["Date"] = pd.to_datetime(df["Date"], format="mixed").dt.normalize()
+    if (df["Date"].notna().to_numpy() & ~valid_dates(df["Date"])).any():
+        raise ValueError(f"Dates must be between {pd.Timestamp.min.date()} and {pd.Timestamp.max.date()}")
+    df["Amount"] = pd.to_numeric(df["Amount"]).astype("float64")
+    df["Description"] = df["Description"].replace("", None)  # Blank reads back as missing
+    return df
+
+
+def with_ids(df, first_id=1):
+    """Return ``df`` with an ID column, numbering rows from ``first_id`` if it has none"""
+    if ID_COLUMN in df.columns:
+        return df
+    df = df.copy()
+    df.insert(0, ID_COLUMN, np.arange(first_id, first_id + len(df), dtype="int64"))
+    return df
+
+
+def apply_changes(df, changes):
+    """Replay update and delete records (in log order) onto a loaded ledger"""
+    if changes.empty:
+        return df
+    latest = changes.drop_duplicates(ID_COLUMN, keep="last")
+    updates = latest[latest["Op"] == "update"]
+    deleted = latest.loc[latest["Op"] == "delete", ID_COLUMN]
+
+    if not updates.empty:
+        positions = pd.Index(df[ID_COLUMN]).get_indexer(updates[ID_COLUMN])
+        found = positions >= 0
+        rows = df.index[positions[found]]
+        for column in LEDGER_COLUMNS:
+            values = updates[column][found].astype(df[column].dtype)
+            df.loc[rows, column] = values.to_numpy()
+    if not deleted.empty:
+        df = df[~df[ID_COLUMN].isin(deleted)]
+    return df.reset_index(drop=True)
+
+
+def write_csv(path, df, columns=None):
+    """Atomically replace a CSV file with ``df``"""
+    if columns is not None:
+        df = df.reindex(columns=columns)
+    with atomic_write(path) as f:
+        df.to_csv(f, index=False, date_format=DATE_FORMAT)
+
+
+def append_csv(path, df, columns):
+    """Append rows to a CSV file, writing the header first if the file is new.
+
+    The rows are fsynced before returning; if writing fails part-way the file
+    is truncated back to its previous length.
+    """
+    signature = file_signature(path)
+    write_header = signature is None or signature[1] == 0
+    if not write_header:
+        columns = read_csv_header(path)
+
+    with open(path, "a", newline="") as f:
+        size = f.tell()
+        try:
+            if not write_header and not _ends_with_newline(path):
+                f.write("\n")
+            df.reindex(columns=columns).to_csv(f, header=write_header, index=False, date_format=DATE_FORMAT)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(size)
+            raise
+
+
+def read_csv_header(path):
+    with open(path, "r", newline="") as f:
+        return f.readline().strip().split(",")
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def goals_version(df):
+    """Content fingerprint of a goals table, for optimistic concurrency checks"""
+    return (len(df), int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+
+def period_bounds(year, month=None):
+    """Return the [start, end) timestamps covering a year or a single month"""
+    year = int(year)
+    if month is None:
+        return pd.Timestamp(year, 1, 1), pd.Timestamp(year + 1, 1, 1)
+    start = pd.Timestamp(year, int(month), 1)
+    return start, start + pd.offsets.MonthBegin(1)
+
+
+def filter_transactions(df, year=None, month=None, category=None, entry_type=None):
+    """Apply the standard page filters to an in-memory ledger"""
+    mask = pd.Series(True, index=df.index)
+    if year is not None:
+        start, end = period_bounds(year, month)
+        mask &= (df["Date"] >= start) & (df["Date"] < end)
+    if category is not None:
+        mask &= df["Category"] == category
+    if entry_type is not None:
+        mask &= df["Type"] == entry_type
+    return df[mask]
+
+
+class CsvGoalsAndBudgets:
+    """Goals and budgets kept as two small CSV files (``goals_file``, ``budgets_file``)"""
+
+    # Goals
+    def load_goals(self):
+        try:
+            return pd.read_csv(self.goals_file, parse_dates=["Deadline"])
+        except (FileNotFoundError, EmptyDataError):
+            return empty_goals()
+
+    def save_goals(self, df):
+        with self.lock():
+            write_csv(self.goals_file, df)
+
+    # Budgets
+    def load_budgets(self):
+        try:
+            df = pd.read_csv(self.budgets_file)
+        except (FileNotFoundError, EmptyDataError):
+            return {}
+        return dict(zip(df["Category"], df["Budget"].astype(float)))
+
+    def save_budgets(self, budgets):
+        df = pd.DataFrame(list(budgets.items()), columns=["Category", "Budget"])
+        with self.lock():
+            write_csv(self.budgets_file, df)
+
+
+class CsvBackend(CsvGoalsAndBudgets):
+    """Flat CSV files: one for transactions, goals and budgets each.
+
+    Transactions live in the ledger file plus a change log of deletes and
+    edits, so neither rewrites existing rows.
+    """
+
+    name = "csv"
+    indexed = False  # Filters run over the cached in-memory ledger
+
+    def __init__(self, expense_file=EXPENSE_FILE, goals_file=GOALS_FILE, budgets_file=BUDGETS_FILE,
+                 hash_index_file=HASH_INDEX_FILE, changes_file=CHANGES_FILE, backup_dir=BACKUP_DIR):
+        self.expense_file = expense_file
+        self.goals_file = goals_file
+        self.budgets_file = budgets_file
+        self.hash_index_file = hash_index_file
+        self.changes_file = changes_file
+        self.backup_dir = backup_dir
+        self._next_id = None  # (signature, next free ID)
+        self._lock = FileLock(os.path.splitext(expense_file)[0] + ".lock")
+
+    @property
+    def key(self):
+        return self.expense_file
+
+    def lock(self):
+        """Exclusive write lock shared by every session and process using these files"""
+        return self._lock
+
+    def backup_files(self):
+        """Data files to include in backups, by name"""
+        return {
+            "transactions": self.expense_file,
+            "changes": self.changes_file,
+            "goals": self.goals_file,
+            "budgets": self.budgets_file,
+        }
+
+    def signature(self):
+        return (file_signature(self.expense_file), file_signature(self.changes_file))
+
+    # Transactions
+    def load_transactions(self):
+        try:
+            df = pd.read_csv(self.expense_file)
+        except (FileNotFoundError, EmptyDataError):
+            return empty_ledger()
+        if ID_COLUMN not in df.columns:
+            return self._upgrade_legacy_file()
+        df["Date"] = pd.to_datetime(df["Date"], format="mixed", errors="coerce")
+        df = df.dropna(subset=["Date"])  # Remove invalid date rows
+        df["Amount"] = df["Amount"].astype("float64")
+        df = apply_changes(df.reset_index(drop=True), self._load_changes())
+        return df[STORED_COLUMNS]
+
+    def _upgrade_legacy_file(self):
+        """Number the rows of a ledger written before transactions had IDs, once"""
+        with self.lock():
+            df = pd.read_csv(self.expense_file)
+            if ID_COLUMN not in df.columns:
+                write_csv(self.expense_file, with_ids(df))
+        return self.load_transactions()
+
+    def _load_changes(self):
+        try:
+            changes = pd.read_csv(self.changes_file)
+        except (FileNotFoundError, EmptyDataError):
+            return pd.DataFrame(columns=CHANGE_COLUMNS)
+        changes["Date"] = pd.to_datetime(changes["Date"], format="mixed", errors="coerce")
+        changes["Amount"] = changes["Amount"].astype("float64")
+        return changes
+
+    def save_transactions(self, df, next_id=None):
+        """Rewrite the ledger file and reduce the change log to the high-water tombstone.
+
+        ``next_id`` raises the next free ID, e.g. to that of the backend a
+        ledger is migrated from, so IDs deleted there are not reused.
+        """
+        with self.lock():
+            next_id = max(self._next_free_id(), next_id or 1)
+            if ID_COLUMN not in df.columns:
+                df = with_ids(df, next_id)
+            self._rewrite_ledger(df, next_id)
+
+    def append_transactions(self, new_rows):
+        """Write only the new rows and return them with their assigned IDs"""
+        with self.lock():
+            signature = file_signature(self.expense_file)
+            if signature is not None and signature[1] > 0 and ID_COLUMN not in read_csv_header(self.expense_file):
+                self._upgrade_legacy_file()
+            new_rows = with_ids(new_rows, self._next_free_id())
+            append_csv(self.expense_file, new_rows, STORED_COLUMNS)
+            self._remember_next_id(int(new_rows[ID_COLUMN].max()) + 1)
+        return new_rows
+
+    def delete_transactions(self, ids, dates=None):
+        """Append a tombstone record for each ID (``dates`` only helps partitioned storage)"""
+        tombstones = pd.DataFrame({"Op": "delete", ID_COLUMN: list(ids)})
+        self._append_changes(tombstones)
+
+    def update_transactions(self, rows, previous_dates=None):
+        """Append an update record holding the new values of each (ID-keyed) row"""
+        self._append_changes(rows.assign(Op="update"))
+
+    def _append_changes(self, changes):
+        with self.lock():
+            next_id = self._next_free_id()
+            append_csv(self.changes_file, changes, CHANGE_COLUMNS)
+            self._remember_next_id(next_id)
+
+    def pending_changes(self):
+        """Number of records in the change log"""
+        try:
+            with open(self.changes_file, "rb") as f:
+                return max(0, sum(1 for _ in f) - 1)
+        except FileNotFoundError:
+            return 0
+
+    def compact_transactions(self, df=None):
+        """Fold the change log into the ledger file.
+
+        ``df`` may be passed if the caller already holds the current ledger.
+        The tombstone of the highest deleted ID is kept so IDs are never reused.
+        Replaying the old log onto the compacted file is harmless, so a crash
+        between the two renames loses nothing.
+        """
+        with self.lock():
+            if df is None:
+                df = self.load_transactions()
+            self._rewrite_ledger(df, self._next_free_id())
+
+    def _rewrite_ledger(self, df, next_id):
+        """Write ``df`` as the whole ledger, keeping a tombstone for the highest ID ever used"""
+        high_water = max(next_id - 1, int(df[ID_COLUMN].max()) if len(df) else 0)
+        write_csv(self.expense_file, df, STORED_COLUMNS)
+        changes = pd.DataFrame(columns=CHANGE_COLUMNS)
+        if high_water > 0 and (len(df) == 0 or df[ID_COLUMN].max() < high_water):
+            changes = pd.DataFrame({"Op": ["delete"], ID_COLUMN: [high_water]}).reindex(columns=CHANGE_COLUMNS)
+        write_csv(self.changes_file, changes)
+        self._remember_next_id(high_water + 1)
+
+    def _next_free_id(self):
+        signature = self.signature()
+        if self._next_id is not None and self._next_id[0] == signature:
+            return self._next_id[1]
+        highest = 0
+        for path in (self.expense_file, self.changes_file):
+            try:
+                ids = pd.read_csv(path, usecols=[ID_COLUMN])[ID_COLUMN]
+            except (FileNotFoundError, EmptyDataError, ValueError):
+                continue
+            if len(ids):
+                highest = max(highest, int(ids.max()))
+        self._next_id = (signature, highest + 1)
+        return highest + 1
+
+    def _remember_next_id(self, next_id):
+        self._next_id = (self.signature(), next_id)
+
+    def next_transaction_id(self):
+        """ID the next appended transaction will get (deleted IDs are never reused)"""
+        with self.lock():
+            return self._next_free_id()
+
+
+class SqliteBackend:
+    """Single SQLite database with indexed transactions, goals and budgets"""
+
+    name = "sqlite"
+    indexed = True  # Filters are pushed down into SQL
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            category TEXT,
+            description TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+        CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type);
+        CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category);
+        CREATE TABLE IF NOT EXISTS goals (
+            goal TEXT,
+            target_amount REAL,
+            amount_saved REAL,
+            deadline TEXT
+        );
+        CREATE TABLE IF NOT EXISTS budgets (
+            category TEXT PRIMARY KEY,
+            budget REAL NOT NULL
+        );
+    """
+
+    SELECT_TRANSACTIONS = (
+        "SELECT id AS ID, date AS Date, type AS Type, amount AS Amount, "
+        "category AS Category, description AS Description FROM transactions"
+    )
+
+    def __init__(self, db_file=DATABASE_FILE, hash_index_file=HASH_INDEX_FILE, backup_dir=BACKUP_DIR):
+        self.db_file = db_file
+        self.hash_index_file = hash_index_file
+        self.backup_dir = backup_dir
+        self._schema_ready = False
+        self._lock = FileLock(os.path.splitext(db_file)[0] + ".lock")
+
+    @property
+    def key(self):
+        return self.db_file
+
+    def lock(self):
+        """Held around read-check-write sequences; SQLite makes each write atomic itself"""
+        return self._lock
+
+    def backup_files(self):
+        return {"database": self.db_file}
+
+    def signature(self):
+        return file_signature(self.db_file)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            if not self._schema_ready:
+                conn.executescript(self.SCHEMA)
+                self._schema_ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_records(df, columns):
+        """Convert a frame into plain Python tuples with NaN as NULL"""
+        df = df[columns].astype(object)
+        return list(df.where(df.notna(), None).itertuples(index=False, name=None))
+
+    @staticmethod
+    def _parse_transactions(df):
+        if df.empty:
+            return empty_ledger()
+        df["Date"] = pd.to_datetime(df["Date"], format=DATE_FORMAT)
+        return df
+
+    # Transactions
+    def load_transactions(self):
+        with self._connect() as conn:
+            df = pd.read_sql_query(f"{self.SELECT_TRANSACTIONS} ORDER BY id", conn)
+        return self._parse_transactions(df)
+
+    def query_transactions(self, year=None, month=None, category=None, entry_type=None):
+        clauses, params = [], []
+        if year is not None:
+            start, end = period_bounds(year, month)
+            clauses.append("date >= ? AND date < ?")
+            params += [start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)]
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if entry_type is not None:
+            clauses.append("type = ?")
+            params.append(entry_type)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            df = pd.read_sql_query(f"{self.SELECT_TRANSACTIONS}{where} ORDER BY id", conn, params=params)
+        return self._parse_transactions(df)
+
+    def _insert_transactions(self, conn, df):
+        df = df.assign(Date=pd.to_datetime(df["Date"]).dt.strftime(DATE_FORMAT))
+        conn.executemany(
+            "INSERT INTO transactions (id, date, type, amount, category, description) VALUES (?, ?, ?, ?, ?, ?)",
+            self._to_records(df, STORED_COLUMNS),
+        )
+
+    @staticmethod
+    def _next_free_id(conn):
+        # AUTOINCREMENT remembers the highest ID ever used, so deleted IDs are not reused
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'").fetchone()
+        return (row[0] if row else 0) + 1
+
+    def save_transactions(self, df, next_id=None):
+        """Replace every transaction; ``next_id`` raises the AUTOINCREMENT sequence (see CsvBackend)"""
+        with self.lock(), self._connect() as conn:
+            conn.execute("DELETE FROM transactions")
+            self._insert_transactions(conn, with_ids(df, self._next_free_id(conn)))
+            if next_id is not None:
+                last_id = next_id - 1
+                updated = conn.execute(
+                    "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'transactions'", (last_id,)
+                )
+                if updated.rowcount == 0:
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', ?)", (last_id,))
+
+    def next_transaction_id(self):
+        with self._connect() as conn:
+            return self._next_free_id(conn)
+
+    def append_transactions(self, new_rows):
+        """Insert the new rows and return them with their assigned IDs"""
+        with self.lock(), self._connect() as conn:
+            new_rows = with_ids(new_rows, self._next_free_id(conn))
+            self._insert_transactions(conn, new_rows)
+        return new_rows
+
+    def delete_transactions(self, ids, dates=None):
+        with self.lock(), self._connect() as conn:
+            conn.executemany("DELETE FROM transactions WHERE id = ?", [(int(i),) for i in ids])
+
+    def update_transactions(self, rows, previous_dates=None):
+        rows = rows.assign(Date=pd.to_datetime(rows["Date"]).dt.strftime(DATE_FORMAT))
+        with self.lock(), self._connect() as conn:
+            conn.executemany(
+                "UPDATE transactions SET date = ?, type = ?, amount = ?, category = ?, description = ? WHERE id = ?",
+                self._to_records(rows, LEDGER_COLUMNS + [ID_COLUMN]),
+            )
+
+    def pending_changes(self):
+        return 0  # Deletes and edits are applied in place
+
+    def compact_transactions(self, df=None):
+        pass
+
+    # Goals
+    def load_goals(self):
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                "SELECT goal AS Goal, target_amount AS [Target Amount], "
+                "amount_saved AS [Amount Saved], deadline AS Deadline FROM goals ORDER BY rowid",
+                conn,
+            )
+        df["Deadline"] = pd.to_datetime(df["Deadline"], errors="coerce")
+        return df
+
+    def save_goals(self, df):
+        df = df.assign(Deadline=pd.to_datetime(df["Deadline"], errors="coerce").dt.strftime(DATE_FORMAT))
+        with self.lock(), self._connect() as conn:
+            conn.execute("DELETE FROM goals")
+            conn.executemany(
+                "INSERT INTO goals (goal, target_amount, amount_saved, deadline) VALUES (?, ?, ?, ?)",
+                self._to_records(df, GOALS_COLUMNS),
+            )
+
+    # Budgets
+    def load_budgets(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT category, budget FROM budgets").fetchall()
+        return {category: float(budget) for category, budget in rows}
+
+    def save_budgets(self, budgets):
+        with self.lock(), self._connect() as conn:
+            conn.execute("DELETE FROM budgets")
+            conn.executemany(
+                "INSERT INTO budgets (category, budget) VALUES (?, ?)",
+                [(category, float(budget)) for category, budget in budgets.items()],
+            )
+
+
+class PartitionedBackend(CsvGoalsAndBudgets):
+    """Transactions in one Parquet file per month under ``ledger_dir/year=YYYY/month=MM``.
+
+    Year, month and date-range reads only open the partitions that can hold
+    matching rows, and writes rewrite just the months they touch. A small JSON
+    manifest holds the next free ID and is rewritten after every write, so its
+    fingerprint is the storage signature. Goals and budgets stay CSV files.
+    Needs the optional ``pyarrow`` package.
+    """
+
+    name = "parquet"
+    indexed = True  # Filters prune partitions instead of loading the whole ledger
+
+    PARTITION_FILE = "part.parquet"
+
+    def __init__(self, ledger_dir=LEDGER_DIR, goals_file=GOALS_FILE, budgets_file=BUDGETS_FILE,
+                 hash_index_file=HASH_INDEX_FILE, backup_dir=BACKUP_DIR):
+        if pyarrow is None:
+            raise ImportError("The parquet storage backend needs pyarrow (pip install pyarrow)")
+        self.ledger_dir = ledger_dir
+        self.manifest_file = os.path.join(ledger_dir, "_manifest.json")
+        self.goals_file = goals_file
+        self.budgets_file = budgets_file
+        self.hash_index_file = hash_index_file
+        self.backup_dir = backup_dir
+        os.makedirs(ledger_dir, exist_ok=True)
+        self._lock = FileLock(os.path.normpath(ledger_dir) + ".lock")
+
+    @property
+    def key(self):
+        return self.ledger_dir
+
+    def lock(self):
+        """Exclusive write lock shared by every session and process using this ledger"""
+        return self._lock
+
+    def backup_files(self):
+        files = {f"partition {year:04d}-{month:02d}": path for year, month, path in self._partitions()}
+        # The manifest goes last so a restore rewrites the signature after the data
+        return {**files, "goals": self.goals_file, "budgets": self.budgets_file, "manifest": self.manifest_file}
+
+    def signature(self):
+        return file_signature(self.manifest_file)
+
+    # Partitions
+    def _partition_path(self, year, month):
+        return os.path.join(self.ledger_dir, f"year={year:04d}", f"month={month:02d}", self.PARTITION_FILE)
+
+    def _partitions(self, start=None, end=None):
+        """(year, month, path) of the partitions overlapping [start, end), in date order"""
+        partitions = []
+        for year_dir in sorted(os.listdir(self.ledger_dir)):
+            if not year_dir.startswith("year="):
+                continue
+            for month_dir in sorted(os.listdir(os.path.join(self.ledger_dir, year_dir))):
+                path = os.path.join(self.ledger_dir, year_dir, month_dir, self.PARTITION_FILE)
+                if not month_dir.startswith("month=") or not os.path.exists(path):
+                    continue
+                year, month = int(year_dir[5:]), int(month_dir[6:])
+                first, after = period_bounds(year, month)
+                if (start is None or after > start) and (end is None or first < end):
+                    partitions.append((year, month, path))
+        return partitions
+
+    def _read_partition(self, path):
+        try:
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return empty_ledger()
+
+    def _read_partitions(self, partitions):
+        """Read several partitions as one Arrow table, converting to pandas once"""
+        tables = [pyarrow.parquet.read_table(path) for _, _, path in partitions]
+        if not tables:
+            return empty_ledger()
+        return self._concat([pyarrow.concat_tables(tables).to_pandas()])
+
+    def _write_partition(self, year, month, df):
+        """Replace one month's file, removing it once the month has no rows"""
+        path = self._partition_path(year, month)
+        if df.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pyarrow.Table.from_pandas(df[STORED_COLUMNS], schema=self._schema(), preserve_index=False)
+        with atomic_write(path, "wb") as f:
+            pyarrow.parquet.write_table(table, f)
+
+    @staticmethod
+    def _schema():
+        """One Arrow schema for every partition, so they concatenate without casts"""
+        return pyarrow.schema([
+            (ID_COLUMN, pyarrow.int64()),
+            ("Date", pyarrow.timestamp("us")),
+            ("Type", pyarrow.large_string()),
+            ("Amount", pyarrow.float64()),
+            ("Category", pyarrow.large_string()),
+            ("Description", pyarrow.large_string()),
+        ])
+
+    def _concat(self, frames):
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return empty_ledger()
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(ID_COLUMN, kind="stable", ignore_index=True)
+
+    @staticmethod
+    def _months(dates):
+        """(year, month) of every date, as a Series of tuples"""
+        dates = pd.to_datetime(pd.Series(dates))
+        return pd.Series(list(zip(dates.dt.year, dates.dt.month)), index=dates.index)
+
+    def _rewrite(self, months, change):
+        """Apply ``change(month, rows) -> rows`` to each (year, month) and write the ones that changed"""
+        for year, month in sorted(months):
+            current = self._read_partition(self._partition_path(year, month))
+            updated = change((year, month), current)
+            if updated is not current:
+                self._write_partition(year, month, updated)
+
+    # Manifest
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            highest = 0
+            for _, _, path in self._partitions():
+                ids = pd.read_parquet(path, columns=[ID_COLUMN])[ID_COLUMN]
+                highest = max(highest, int(ids.max()) if len(ids) else 0)
+            return {"next_id": highest + 1, "version": 0}
+
+    def _write_manifest(self, manifest):
+        manifest["version"] += 1
+        with atomic_write(self.manifest_file) as f:
+            json.dump(manifest, f)
+
+    def _assign_ids(self, df, next_id=None):
+        """Number rows without IDs and record the new high-water mark before any data is written"""
+        manifest = self._read_manifest()
+        manifest["next_id"] = max(manifest["next_id"], next_id or 1)
+        df = with_ids(df, manifest["next_id"])
+        if len(df):
+            manifest["next_id"] = max(manifest["next_id"], int(df[ID_COLUMN].max()) + 1)
+        self._write_manifest(manifest)  # A crash after this leaves a gap in the IDs, never a reuse
+        return df, manifest
+
+    # Transactions
+    def load_transactions(self):
+        return self._read_partitions(self._partitions())
+
+    def read_date_range(self, start=None, end=None):
+        """Transactions with start <= Date < end, reading only the overlapping partitions"""
+        df = self._read_partitions(self._partitions(start, end))
+        if start is not None:
+            df = df[df["Date"] >= start]
+        if end is not None:
+            df = df[df["Date"] < end]
+        return df.reset_index(drop=True)
+
+    def query_transactions(self, year=None, month=None, category=None, entry_type=None):
+        start, end = period_bounds(year, month) if year is not None else (None, None)
+        return filter_transactions(self.read_date_range(start, end), None, None, category, entry_type)
+
+    def save_transactions(self, df, next_id=None):
+        """Replace every transaction; ``next_id`` raises the manifest's next free ID (see CsvBackend)"""
+        with self.lock():
+            df, manifest = self._assign_ids(df, next_id)
+            groups = dict(list(df.groupby(self._months(df["Date"])))) if len(df) else {}
+            for year, month, _ in self._partitions():
+                if (year, month) not in groups:
+                    self._write_partition(year, month, empty_ledger())
+            for (year, month), rows in groups.items():
+                self._write_partition(year, month, rows)
+            self._write_manifest(manifest)
+
+    def append_transactions(self, new_rows):
+        """Add the new rows to their months' files and return them with their assigned IDs"""
+        with self.lock():
+            new_rows, manifest = self._assign_ids(new_rows)
+            groups = dict(list(new_rows.groupby(self._months(new_rows["Date"]))))
+            self._rewrite(groups, lambda month, current: self._concat([current, groups[month]]))
+            self._write_manifest(manifest)
+        return new_rows
+
+    def delete_transactions(self, ids, dates=None):
+        """Drop rows by ID; ``dates`` (their current dates) limits the months rewritten"""
+        ids = set(ids)
+
+        def drop(month, current):
+            keep = ~current[ID_COLUMN].isin(ids)
+            return current if keep.all() else current[keep]
+
+        with self.lock():
+            months = set(self._months(dates)) if dates is not None else {(y, m) for y, m, _ in self._partitions()}
+            self._rewrite(months, drop)
+            self._write_manifest(self._read_manifest())
+
+    def update_transactions(self, rows, previous_dates=None):
+        """Replace rows by ID, moving them between months if their date changed"""
+        rows = rows.reset_index(drop=True)
+        new_months = self._months(rows["Date"])
+        ids = set(rows[ID_COLUMN])
+
+        def replace(month, current):
+            kept = current[~current[ID_COLUMN].isin(ids)]
+            return self._concat([kept, rows[[new_month == month for new_month in new_months]]])
+
+        with self.lock():
+            if previous_dates is not None:
+                months = set(self._months(previous_dates))
+            else:
+                months = {(y, m) for y, m, _ in self._partitions()}
+            self._rewrite(months | set(new_months), replace)
+            self._write_manifest(self._read_manifest())
+
+    def next_transaction_id(self):
+        return self._read_manifest()["next_id"]
+
+    def pending_changes(self):
+        return 0  # Deletes and edits rewrite their months in place
+
+    def compact_transactions(self, df=None):
+        pass
+
+
+BACKENDS = {"csv": CsvBackend, "sqlite": SqliteBackend, "parquet": PartitionedBackend}
+
+_default_backend = None
+_user_backends = {}  # user data directory -> backend, so each user's files share one lock
+_user_backends_lock = threading.Lock()
+_current_user = contextvars.ContextVar("current_user", default=None)
+
+
+def user_data_dir(user):
+    """Directory holding ``user``'s data; raises ValueError for identifiers unsafe as a path"""
+    if not USER_ID_PATTERN.fullmatch(user) or ".." in user:
+        raise ValueError(f"Invalid user identifier: {user!r}")
+    return os.path.join(USERS_DIR, user.lower())
+
+
+def _backend_in(directory):
+    """A backend of the configured kind keeping all of its files in ``directory``"""
+    def path(default):
+        return os.path.join(directory, os.path.basename(default))
+
+    backup_dir = os.path.join(directory, "backups")
+    if STORAGE_BACKEND == "sqlite":
+        return SqliteBackend(path(DATABASE_FILE), path(HASH_INDEX_FILE), backup_dir)
+    if STORAGE_BACKEND == "parquet":
+        return PartitionedBackend(path(LEDGER_DIR), path(GOALS_FILE), path(BUDGETS_FILE), path(HASH_INDEX_FILE),
+                                  backup_dir)
+    return CsvBackend(
+        path(EXPENSE_FILE), path(GOALS_FILE), path(BUDGETS_FILE), path(HASH_INDEX_FILE), path(CHANGES_FILE),
+        backup_dir,
+    )
+
+
+def user_backend(user):
+    """Return the backend for ``user``'s ledger, goals, budgets and backups"""
+    directory = user_data_dir(user)
+    with _user_backends_lock:
+        backend = _user_backends.get(directory)
+        if backend is None:
+            os.makedirs(directory, exist_ok=True)
+            backend = _backend_in(directory)
+            _user_backends[directory] = backend
+        return backend
+
+
+def set_current_user(user):
+    """Route ``get_backend`` in this thread/context to ``user``'s data (None for the shared data)"""
+    if user:
+        user_data_dir(user)
+    _current_user.set(user or None)
+
+
+def current_user():
+    return _current_user.get()
+
+
+def get_backend():
+    """Return the current user's backend, or the shared one selected by STORAGE_BACKEND"""
+    if STORAGE_BACKEND not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND!r}")
+    user = _current_user.get()
+    if user is not None:
+        return user_backend(user)
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = BACKENDS[STORAGE_BACKEND]()
+    return _default_backend
+
+
+def load_goals_data():
+    """Load goals data from the configured storage backend"""
+    return get_backend().load_goals()
+
+
+def save_goals_data(df, expected_version=None, backend=None):
+    """Save goals data to the configured storage backend.
+
+    Pass the ``goals_version`` of the goals the edit was based on to refuse
+    (with ConflictError) if another session changed them in the meantime.
+    """
+    return update_goals_data(lambda current: df, expected_version, backend)
+
+
+def update_goals_data(change, expected_version=None, backend=None):
+    """Apply ``change(current_goals) -> goals`` under the write lock and return the saved goals"""
+    backend = backend or get_backend()
+    with backend.lock():
+        current = backend.load_goals()
+        if expected_version is not None and goals_version(current) != expected_version:
+            raise ConflictError("Goals were changed by another session")
+        backend.save_goals(change(current))
+        return backend.load_goals()
+
+
+def load_budgets_data():
+    """Load the {category: budget} mapping from the configured storage backend"""
+    return get_backend().load_budgets()
+
+
+def save_budgets_data(budgets):
+    """Save the {category: budget} mapping to the configured storage backend"""
+    get_backend().save_budgets(budgets)
+
+
+def set_budget_data(category, amount, backend=None):
+    """Set one category's budget on top of the stored budgets and return them all.
+
+    The stored mapping is re-read under the write lock, so budgets set by
+    other sessions since this one loaded are kept.
+    """
+    backend = backend or get_backend()
+    with backend.lock():
+        budgets = backend.load_budgets()
+        budgets[category] = amount
+        backend.save_budgets(budgets)
+    return budgets
+
+
+def migrate_csv_to_sqlite(source=None, target=None, overwrite=False):
+    """Copy transactions, goals and budgets from the CSV files into SQLite"""
+    return migrate_storage(source or CsvBackend(), target or SqliteBackend(), overwrite)
+
+
+def migrate_storage(source, target, overwrite=False):
+    """Copy transactions (with their IDs), goals and budgets from one backend to another.
+
+    The target continues the source's ID sequence, so IDs deleted before the
+    migration are not handed out again.
+    """
+    if not overwrite and not target.load_transactions().empty:
+        raise ValueError(f"{target.key} already contains transactions; pass overwrite=True to replace them")
+
+    transactions = source.load_transactions()
+    goals = source.load_goals()
+    budgets = source.load_budgets()
+    target.save_transactions(transactions, next_id=source.next_transaction_id())
+    target.save_goals(goals)
+    target.save_budgets(budgets)
+    return {"transactions": len(transactions), "goals": len(goals), "budgets": len(budgets)}
+
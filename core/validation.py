@@ -0,0 +1,59 @@
+"""Input validation and sanitizing for transaction entries"""
+import re
+import pandas as pd
+from config import MIN_AMOUNT, MAX_AMOUNT, MAX_DESCRIPTION_LENGTH
+
+
+def validate_amount(amount):
+    """Validate amount input"""
+    try:
+        amount = float(amount)
+        return MIN_AMOUNT <= amount <= MAX_AMOUNT
+    except (ValueError, TypeError):
+        return False
+
+
+def valid_dates(dates):
+    """Boolean mask of the dates the ledger can hold (within the datetime64[ns] range).
+
+    pandas parses far-off dates such as a mistyped "0202-03-01" without error,
+    but the date index and daily sums can't represent them.
+    """
+    return pd.Series(dates).between(pd.Timestamp.min, pd.Timestamp.max).to_numpy()
+
+
+def validate_category(category):
+    """Validate category input"""
+    if not category or not str(category).strip():
+        return False
+    return len(str(category).strip()) <= 50
+
+
+def validate_description(description):
+    """Validate description input"""
+    if description is None:
+        return True  # Description is optional
+    return len(str(description)) <= MAX_DESCRIPTION_LENGTH
+
+
+def sanitize_input(text):
+    """Remove potentially harmful characters"""
+    if text is None:
+        return ""
+    return re.sub(r'[<>"\']', '', str(text))
+
+
+def validate_entry(amount, category, description=""):
+    """Validate complete entry"""
+    errors = []
+
+    if not validate_amount(amount):
+        errors.append(f"Amount must be between {MIN_AMOUNT} and {MAX_AMOUNT}")
+
+    if not validate_category(category):
+        errors.append("Category is required and must be less than 50 characters")
+
+    if not validate_description(description):
+        errors.append(f"Description must be less than {MAX_DESCRIPTION_LENGTH} characters")
+
+    return errors
@@ -15,25 +15,29 @@ import streamlit as st
 import pandas as pd
 import os
 from datetime import datetime
+from core import (
+    load_goals_data, save_goals_data, update_goals_data, goals_version, ConflictError,
+    forecast_goals, get_monthly_savings_rate
+)
 
 st.title("🎯 Financial Goals")
 
-# File path to store goals
-GOALS_FILE = os.path.join("data", "financial_goals.csv")
-os.makedirs("data", exist_ok=True)
-
 # Load existing goals or create an empty DataFrame
 def load_goals():
-    if os.path.exists(GOALS_FILE):
-        return pd.read_csv(GOALS_FILE, parse_dates=["Deadline"])
-    else:
-        return pd.DataFrame(columns=["Goal", "Target Amount", "Amount Saved", "Deadline"])
+    return load_goals_data()
 
 def save_goals(df):
-    df.to_csv(GOALS_FILE, index=False)
+    """Save goals edited from the cards rendered on the previous run"""
+    try:
+        save_goals_data(df, expected_version=st.session_state.get("goals_version"))
+    except ConflictError:
+        st.session_state["goals_conflict"] = True
 
 goals_df = load_goals()
 
+if st.session_state.pop("goals_conflict", False):
+    st.warning("⚠️ Goals were changed in another session. The latest goals are shown; please try again.")
+
 
 tab1, tab2 = st.tabs(["🎯 Add a New Goal"," 📋 Your Goals "])
 
@@ -61,8 +65,7 @@ with tab1:
                     "Amount Saved": amount_saved,
                     "Deadline": pd.to_datetime(deadline)
                 }])
-                goals_df = pd.concat([goals_df, new_goal], ignore_index=True)
-                save_goals(goals_df)
+                goals_df = update_goals_data(lambda current: pd.concat([current, new_goal], ignore_index=True))
                 st.success("✅ Goal saved successfully!")
 
 with tab2: 
@@ -93,12 +96,15 @@ with tab2:
             unsafe_allow_html=True,
         )
 
-        # Ensure proper types
-        goals_df_display = goals_df.copy()
+        # Progress, monthly saving needed and projected completion for all goals at once
+        monthly_saving = get_monthly_savings_rate(days=90)
+        goals_df_display = forecast_goals(goals_df, monthly_saving)
         goals_df_display["Deadline"] = pd.to_datetime(goals_df_display["Deadline"], errors="coerce")
+        st.caption(f"Projections assume your recent net savings of ₹ {monthly_saving:,.2f} per month (last 90 days) go to each goal.")
 
         # Sort by nearest deadline
         goals_df_display = goals_df_display.sort_values("Deadline")
+        goal_rows = goals_df_display.to_dict("records")
 
         # Show in 4-column grid with quick update/delete actions
         cols_per_row = 4
@@ -109,14 +115,19 @@ with tab2:
                 idx = start_idx + offset
                 if idx >= len(goals_df_display):
                     continue
-                row = goals_df_display.iloc[idx]
+                row = goal_rows[idx]
                 goal_name = str(row["Goal"]) if pd.notna(row["Goal"]) else "Untitled Goal"
                 target_amt = float(row["Target Amount"]) if pd.notna(row["Target Amount"]) else 0.0
                 saved_amt = float(row["Amount Saved"]) if pd.notna(row["Amount Saved"]) else 0.0
-                remaining = max(0.0, target_amt - saved_amt)
+                remaining = row["Remaining"]
                 deadline_dt = row["Deadline"]
                 deadline_str = deadline_dt.date().isoformat() if pd.notna(deadline_dt) else "—"
-                progress = 0.0 if target_amt <= 0 else min(1.0, saved_amt / target_amt)
+                projected_dt = row["Projected Completion"]
+                projected_str = projected_dt.date().isoformat() if pd.notna(projected_dt) else "—"
+                required_amt = row["Required Monthly"]
+                required_str = f"₹ {required_amt:,.2f}" if pd.notna(required_amt) else "—"
+                pace_icon = "✅" if row["On Track"] else "⚠️"
+                progress = row["Progress"]
 
                 with cols[offset]:
                     st.markdown(
@@ -127,6 +138,8 @@ with tab2:
                             <div class="goal-line"><span class="muted">Saved</span><span class="value">₹ {saved_amt:,.2f}</span></div>
                             <div class="goal-line"><span class="muted">Remaining</span><span class="value">₹ {remaining:,.2f}</span></div>
                             <div class="goal-line"><span class="muted">Deadline</span><span class="value">{deadline_str}</span></div>
+                            <div class="goal-line"><span class="muted">Needed / month</span><span class="value">{required_str}</span></div>
+                            <div class="goal-line"><span class="muted">Projected</span><span class="value">{pace_icon} {projected_str}</span></div>
                         </div>
                         """,
                         unsafe_allow_html=True,
@@ -155,10 +168,21 @@ with tab2:
 
         st.markdown("---")
         st.markdown("#### 📋 All Goals")
-        st.dataframe(goals_df_display, hide_index=True)
+        st.dataframe(
+            goals_df_display,
+            hide_index=True,
+            column_config={
+                "Progress": st.column_config.ProgressColumn("Progress", min_value=0.0, max_value=1.0, format="percent"),
+                "Deadline": st.column_config.DateColumn("Deadline"),
+                "Projected Completion": st.column_config.DateColumn("Projected Completion"),
+                "Remaining": st.column_config.NumberColumn("Remaining", format="₹ %.2f"),
+                "Required Monthly": st.column_config.NumberColumn("Required Monthly", format="₹ %.2f"),
+            },
+        )
 
         # Download
-        csv = goals_df_display.to_csv(index=False).encode('utf-8')
+        csv = goals_df_display[goals_df.columns].to_csv(index=False).encode('utf-8')
         st.download_button("📥 Download Goals", data=csv, file_name="financial_goals.csv", mime="text/csv")
 
-
+# Version of the goals the cards above were built from, checked when they are saved
+st.session_state["goals_version"] = goals_version(goals_df)
@@ -5,7 +5,8 @@ import os
 from datetime import datetime
 import plotly.express as px
 import matplotlib.pyplot as plt
-from pandas.errors import EmptyDataError
+from core import load_ledger, get_overview_totals, charts
+from config import CHART_RANGES
 
 
 # ---------- CSV FILE SETUP ----------
@@ -36,34 +37,20 @@ with col3:
     if st.button("📊 Check Reports",type="tertiary", use_container_width=True):
         st.switch_page("report.py")
 
-# ---------- CSV FILE SETUP ----------
-
-csv_file = os.path.join("data", "add_expense.csv")
-
-# Load data from CSV or create a new DataFrame
-def load_data():
-    try:
-        df = pd.read_csv(csv_file)
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")  # force datetime conversion
-        df = df.dropna(subset=["Date"])  # remove invalid date rows
-        return df
-        # return pd.read_csv(csv_file, parse_dates=["Date"])
-    except (FileNotFoundError, EmptyDataError):
-        return pd.DataFrame(columns=["Date", "Type", "Amount", "Category", "Description"])
+# ---------- LEDGER ----------
 
-# def save_data(df):
-#     df.to_csv(csv_file, index=False)
-df_data = load_data()
+df_data = load_ledger()
 
 if df_data.empty:
     st.info("ℹ️ No transactions yet. Start by adding one.")
     st.image("images/tracker.gif")
 else:
     # ---------- SUMMARY METRICS ----------
-    total_income = df_data[df_data["Type"] == "Income"]["Amount"].sum()
-    total_expenses = df_data[df_data["Type"] == "Expense"]["Amount"].sum()
-    net_savings = total_income - total_expenses
-    savings_ratio = net_savings / total_income if total_income != 0 else 0
+    totals = get_overview_totals()
+    total_income = totals["income"]
+    total_expenses = totals["expense"]
+    net_savings = totals["net"]
+    savings_ratio = totals["savings_ratio"]
 
 
     col1, col2, col3 = st.columns(3)
@@ -84,44 +71,24 @@ else:
     #     st.dataframe(df_data.head(5))  # Replace with your recent transactions data
     with col1:   
         st.markdown("##### 📄 Recent Transactions")
-        recent_df = df_data.copy()
+        recent_df = df_data.drop(columns="ID")
         recent_df["Date"] = recent_df["Date"].dt.strftime("%d-%m-%Y")
         st.dataframe(recent_df.head(5), hide_index=True)
     with col2:
-        pie_data = df_data[df_data["Type"] == "Expense"].groupby("Category")["Amount"].sum().reset_index()
-        pie_data["Amount"] = pd.to_numeric(pie_data["Amount"], errors="coerce")
-
-        fig_pie = px.pie(pie_data, names="Category", values="Amount", title="💰 Expenses by Category",hole=0.4)
-        fig_pie.update_layout(
-            width=250,  
-            height=250, 
-            margin=dict(t=40, b=0, l=0, r=0) ,
-            # title = dict(
-            #     text = "Expenses by Category",
-            #     font= dict(size=20,family='Arial',color="black"),
-            #     x = 0.5,
-            #     xanchor ='center'
-            # )
-        )
-
+        fig_pie = charts.home_expenses_pie()
         st.plotly_chart(fig_pie, use_container_width=True)
 
     # st.markdown("---")
     # st.markdown("#### 📊 Expense Distribution")
 
     # LINE CHART
-    line_data = df_data.groupby("Date")["Amount"].sum().reset_index()
-    fig_line = px.line(line_data, x="Date", y="Amount")
-    fig_line.update_layout(
-        title=dict(
-            text="Cash Flow Over Time",
-            font=dict(size=20,family='Arial'),
-            x = 0.5,
-            xanchor='center'
-        )
-    )
+    chart_range = st.radio("Range", list(CHART_RANGES), horizontal=True, label_visibility="collapsed")
+    fig_line = charts.home_cash_flow(chart_range)
     st.plotly_chart(fig_line, use_container_width=True)
 
+    fig_balance = charts.home_balance(chart_range)
+    st.plotly_chart(fig_balance, use_container_width=True)
+
 
 
 # Footer
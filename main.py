@@ -1,8 +1,38 @@
 import streamlit as st
+from streamlit.errors import StreamlitSecretNotFoundError
 from config import *
+from core import set_current_user
+from core.refresh import start_refresh_worker
 
 st.set_page_config(page_title=APP_TITLE, layout=PAGE_LAYOUT, page_icon=APP_ICON)
 
+def auth_configured():
+    try:
+        return "auth" in st.secrets
+    except StreamlitSecretNotFoundError:
+        return False
+
+
+# Each user's ledger, goals, budgets and backups live in their own data directory.
+# ?user= only applies without authentication, and never with an email-like ID,
+# so it can't open the directory of someone who logs in.
+if st.user.get("is_logged_in"):
+    user = st.user.get("email")
+elif auth_configured():
+    user = None
+else:
+    user = st.query_params.get(USER_QUERY_PARAM)
+try:
+    if user and not st.user.get("is_logged_in") and "@" in user:
+        raise ValueError(f"Invalid user identifier: {user!r} (\"@\" is reserved for logged-in users)")
+    set_current_user(user)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+
+# Rebuild aggregates and charts in the background after every write
+start_refresh_worker()
+
 # Create navigation pages
 home_page = st.Page("home.py", title="🏠 Home", default=True)
 about_page = st.Page("about.py", title="ℹ️ About")  
@@ -23,7 +53,7 @@ with st.sidebar:
         from utils import load_cached_expense_data, get_total_balance, format_currency
         df_data = load_cached_expense_data()
         if not df_data.empty:
-            total_balance = get_total_balance(df_data)
+            total_balance = get_total_balance()
             st.metric("💰 Total Balance", format_currency(total_balance))
     except:
         pass  
@@ -38,6 +68,8 @@ with st.sidebar:
             st.switch_page("report.py")
 
     st.markdown("---")
+    if user:
+        st.caption(f"👤 {user}")
     st.caption(f"© {DEVELOPER_NAME} • All rights reserved")
 
 pg.run()
@@ -3,29 +3,13 @@ import streamlit as st
 import pandas as pd
 import os 
 from datetime import datetime, timedelta
+from core import load_ledger, get_monthly_cube
 
 st.title("📅 Monthly Overview")
 
 
-# ---------- CSV FILE SETUP ----------
-csv_file = os.path.join("data", "add_expense.csv")
-
-# Load data from CSV or create a new DataFrame
-def load_data():
-    try:
-        df = pd.read_csv(csv_file)
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")  # force datetime conversion
-        df = df.dropna(subset=["Date"])  # remove invalid date rows
-        return df
-        # return pd.read_csv(csv_file, parse_dates=["Date"])
-    except FileNotFoundError:
-        return pd.DataFrame(columns=["Date", "Type", "Amount", "Category", "Description"])
-
-def save_data(df):
-    df.to_csv(csv_file, index=False)
-
-df_data = load_data()
-df_data = df_data.dropna(subset=["Date"]) 
+# ---------- LEDGER ----------
+df_data = load_ledger()
 # if not df_data.empty:
 #     st.text("No transactions")
 if df_data.empty or "Date" not in df_data:
@@ -33,15 +17,10 @@ if df_data.empty or "Date" not in df_data:
     st.stop()
 
 # ----------- SELECT YEAR ------------
-df_data["Date"] = pd.to_datetime(df_data["Date"], errors="coerce")
-
-years_available = df_data["Date"].dt.year.unique()
+cube = get_monthly_cube()
+years_available = cube.years()
 selected_year = st.selectbox("📅 Select Year for Monthly Summary", sorted(years_available, reverse=True))
 
-# Filter data for selected year
-year_data = df_data[df_data["Date"].dt.year == selected_year]
-year_data["Month"] = year_data["Date"].dt.month_name()
-
 # ----------- MONTHLY DISPLAY CARDS ------------
 st.subheader(f"Monthly Summary Cards for {selected_year}")
 
@@ -78,10 +57,10 @@ for i in range(0, 12, 3):  # Show in 3-column layout
     for j in range(3):
         if i + j < 12:
             month = month_order[i + j]
-            month_df = year_data[year_data["Month"] == month]
-            income = month_df[month_df["Type"] == "Income"]["Amount"].sum()
-            expense = month_df[month_df["Type"] == "Expense"]["Amount"].sum()
-            net = income - expense
+            summary = cube.summary(selected_year, i + j + 1)
+            income = summary["income"]
+            expense = summary["expense"]
+            net = summary["net"]
 
             card_html = f"""
                 <div class='card'>
@@ -3,28 +3,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import os 
+from core import load_ledger, query_transactions, get_monthly_cube, charts
 
 st.title("📈 Reports & Analytics")
 
 
-# ---------- CSV FILE SETUP ----------
-csv_file = os.path.join("data", "add_expense.csv")
-# Load data from CSV or create a new DataFrame
-def load_data():
-    try:
-        df = pd.read_csv(csv_file)
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")  # force datetime conversion
-        df = df.dropna(subset=["Date"])  # remove invalid date rows
-        return df
-
-        # return pd.read_csv(csv_file, parse_dates=["Date"])
-    except FileNotFoundError:
-        return pd.DataFrame(columns=["Date", "Type", "Amount", "Category", "Description"])
-
-def save_data(df):
-    df.to_csv(csv_file, index=False)
-
-df_data = load_data()
+# ---------- LEDGER ----------
+df_data = load_ledger()
+cube = get_monthly_cube()
 
 
 tab1, tab2 = st.tabs(["📊 Visual Insights","Yealy sumary section"])
@@ -46,21 +32,21 @@ with tab1:
                 9: "September", 10: "October", 11: "November", 12: "December"}
 
         col1, col2 = st.columns(2)
-        selected_year = col1.selectbox("Select Year", sorted(df_data["Date"].dt.year.unique(), reverse=True))
+        selected_year = col1.selectbox("Select Year", cube.years()[::-1])
         selected_month = col2.selectbox("Select Month", list(months.values()))
 
         month_number = list(months.values()).index(selected_month) + 1
-        filtered_df = df_data[(df_data["Date"].dt.year == selected_year) & 
-                            (df_data["Date"].dt.month == month_number)]
+        filtered_df = query_transactions(year=selected_year, month=month_number)
         
         # --- Monthly Summary ---
     st.subheader(f"📌 Summary ")
     st.markdown(f"👋 Hello Misbah ! Here's your financial summary for **{selected_month} {selected_year}**.")
 
 
-    income_month = filtered_df[filtered_df["Type"] == "Income"]["Amount"].sum()
-    expense_month = filtered_df[filtered_df["Type"] == "Expense"]["Amount"].sum()
-    net_month = income_month - expense_month
+    month_summary = cube.summary(selected_year, month_number)
+    income_month = month_summary["income"]
+    expense_month = month_summary["expense"]
+    net_month = month_summary["net"]
 
     col1, col2, col3 = st.columns(3)
     col1.metric("💰 Income", f"₹ {income_month:,.2f}")
@@ -81,20 +67,17 @@ with tab1:
     else:
         # PIE CHART
 
-        pie_data = filtered_df[filtered_df["Type"] == "Expense"].groupby("Category")["Amount"].sum().reset_index()
-        fig_pie = px.pie(pie_data, names="Category", values="Amount", title="Expenses by Category")
+        fig_pie = charts.report_expenses_pie(selected_year, month_number)
         st.plotly_chart(fig_pie, use_container_width=True)
 
         
 
         # LINE CHART
-        line_data = filtered_df.groupby("Date")["Amount"].sum().reset_index()
-        fig_line = px.line(line_data, x="Date", y="Amount", title="Cash Flow Over Time")
+        fig_line = charts.report_cash_flow(selected_year, month_number)
         st.plotly_chart(fig_line, use_container_width=True)
 
         # BAR CHART
-        bar_data = filtered_df.groupby(["Category", "Type"])["Amount"].sum().reset_index()
-        fig_bar = px.bar(bar_data, x="Category", y="Amount", color="Type", barmode="group", title="Income vs Expenses by Category")
+        fig_bar = charts.report_category_type(selected_year, month_number)
         st.plotly_chart(fig_bar, use_container_width=True)
 
 
@@ -102,15 +85,15 @@ with tab1:
 with tab2:
     st.subheader("📅 Yearly Summary")
 
-    years_available = df_data["Date"].dt.year.dropna().unique().tolist()
+    years_available = cube.years()
     selected_year = st.selectbox("Select Year", sorted(years_available, reverse=True),key="year-summary")
 
-    year_df = df_data[df_data["Date"].dt.year == selected_year]
+    year_summary = cube.summary(selected_year)
 
-    if not year_df.empty:
-        year_income = year_df[year_df["Type"] == "Income"]["Amount"].sum()
-        year_expense = year_df[year_df["Type"] == "Expense"]["Amount"].sum()
-        net_yearly = year_income - year_expense
+    if year_summary["transactions"] > 0:
+        year_income = year_summary["income"]
+        year_expense = year_summary["expense"]
+        net_yearly = year_summary["net"]
 
         st.markdown(f"""
         <div style="display: flex; justify-content: space-around; margin-bottom: 2rem;">
@@ -121,13 +104,7 @@ with tab2:
         """, unsafe_allow_html=True)
 
         # Monthly bar chart for the selected year
-        monthly_summary = year_df.groupby([year_df["Date"].dt.strftime('%b'), "Type"])["Amount"].sum().reset_index()
-        monthly_summary["Month"] = pd.Categorical(monthly_summary["Date"], categories=[
-            'Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'], ordered=True)
-        monthly_summary = monthly_summary.sort_values("Month")
-
-        bar_chart = px.bar(monthly_summary, x="Month", y="Amount", color="Type",
-                        barmode="group", title=f"📊 Monthly Income vs Expenses - {selected_year}")
+        bar_chart = charts.report_monthly_type(selected_year)
         st.plotly_chart(bar_chart, use_container_width=True)
     else:
         st.info("No data available for the selected year.")
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from core.goals import forecast_goals
+
+
+def goals_frame(**columns):
+    base = {"Goal": ["Trip"], "Target Amount": [1000.0], "Amount Saved": [0.0], "Deadline": ["2027-10-18"]}
+    return pd.DataFrame({**base, **columns})
+
+
+def test_projection_past_timestamp_max_is_nat():
+    goals = goals_frame(**{"Target Amount": [1e6]})
+    result = forecast_goals(goals, monthly_saving=0.34, today="2026-10-18")
+    assert pd.isna(result["Projected Completion"].iloc[0])
+    assert not result["On Track"].iloc[0]
+
+
+def test_projection_at_regular_rate():
+    result = forecast_goals(goals_frame(), monthly_saving=100.0, today="2026-10-18")
+    days = int(np.ceil(1000.0 / 100.0 * 365.25 / 12))
+    assert result["Projected Completion"].iloc[0] == pd.Timestamp("2026-10-18") + pd.Timedelta(days=days)
+    assert result["On Track"].iloc[0]
+
+
+def test_no_saving_gives_nat_unless_reached():
+    goals = goals_frame(**{"Goal": ["Open", "Done"], "Target Amount": [1000.0, 500.0],
+                           "Amount Saved": [0.0, 500.0], "Deadline": ["2027-10-18", "2027-10-18"]})
+    result = forecast_goals(goals, monthly_saving=0.0, today="2026-10-18")
+    assert pd.isna(result["Projected Completion"].iloc[0])
+    assert result["On Track"].tolist() == [False, True]
@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+from core import CsvBackend, SqliteBackend, PartitionedBackend, ledger, migrate_storage
+from core.compact import INCOME, EXPENSE
+
+
+def csv_backend(path):
+    return CsvBackend(str(path / "expense.csv"), str(path / "goals.csv"), str(path / "budgets.csv"),
+                      str(path / "hashes.bin"), str(path / "changes.csv"), str(path / "backups"))
+
+
+def sqlite_backend(path):
+    return SqliteBackend(str(path / "ledger.db"), str(path / "hashes.bin"), str(path / "backups"))
+
+
+def parquet_backend(path):
+    pytest.importorskip("pyarrow")
+    return PartitionedBackend(str(path / "ledger"), str(path / "goals.csv"), str(path / "budgets.csv"),
+                              str(path / "hashes.bin"), str(path / "backups"))
+
+
+BACKENDS = {"csv": csv_backend, "sqlite": sqlite_backend, "parquet": parquet_backend}
+
+
+def rows(count, start=0):
+    categories = ["Food", "Rent", "Travel", "Salary"]
+    return [{
+        "Date": f"2024-{1 + (i * 7) % 12:02d}-{1 + (i * 5) % 28:02d}",
+        "Type": "Income" if i % 5 == 0 else "Expense",
+        "Amount": round(10 + i * 3.25, 2),
+        "Category": categories[i % len(categories)],
+        "Description": f"row {i}",
+    } for i in range(start, start + count)]
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request, tmp_path):
+    backend = BACKENDS[request.param](tmp_path)
+    ledger.append_transactions(rows(40), backend=backend)
+    warm(backend)
+    yield backend
+    ledger.invalidate(backend)
+
+
+def warm(backend):
+    """Build every cached structure so the next write has to patch them"""
+    ledger.get_compact_ledger(backend)
+    ledger.get_monthly_cube(backend)
+    ledger.get_daily_sums(backend)
+    ledger.get_spending_stats(backend)
+    ledger.get_hash_index(backend)
+    ledger.count_date_range("2024-01-01", "2024-12-31", backend=backend)
+
+
+def category_stats(daily, sign):
+    labels, sums, counts = daily.category_stats(sign)
+    return {label: (int(total), int(count)) for label, total, count in zip(labels, sums, counts)}
+
+
+def snapshot(backend):
+    """The cached ledger and its derived structures in comparable form"""
+    frame = ledger.load_ledger(backend).copy()
+    compact = ledger.get_compact_ledger(backend)
+    cube = ledger.get_monthly_cube(backend)
+    daily = ledger.get_daily_sums(backend)
+    days = pd.date_range("2023-12-31", "2025-01-01")
+    positions = ledger.query_date_range("2024-01-01", "2024-12-31", backend=backend)
+    return {
+        "frame": frame,
+        "compact": (compact.dates.tolist(), compact.signs.tolist(), compact.paise.tolist(),
+                    list(compact.category), list(compact.description)),
+        "cube": {(month, key): tuple(cell) for month, cells in cube._cells.items()
+                 for key, cell in cells.items() if cell[1]},
+        "daily": ([daily.balance_at(day) for day in days],
+                  [category_stats(daily, sign) for sign in (INCOME, EXPENSE)]),
+        "date_index": positions["ID"].tolist(),
+        "hashes": dict(ledger.get_hash_index(backend)._hashes),
+    }
+
+
+def assert_matches_fresh_load(backend):
+    patched = snapshot(backend)
+    ledger.invalidate(backend, discard_hash_index=True)
+    fresh = snapshot(backend)
+    pd.testing.assert_frame_equal(patched.pop("frame"), fresh.pop("frame"))
+    assert patched == fresh
+
+
+def test_append(backend):
+    ledger.append_transactions(rows(15, start=40), backend=backend)
+    assert_matches_fresh_load(backend)
+
+
+def test_delete(backend):
+    ledger.delete_transactions([1, 7, 40], backend=backend)
+    assert_matches_fresh_load(backend)
+
+
+def test_edit(backend):
+    ledger.update_transaction(3, {"Date": "2024-02-29", "Amount": 1.5, "Category": "Gifts"}, backend=backend)
+    ledger.update_transaction(9, {"Type": "Income", "Description": "refund"}, backend=backend)
+    assert_matches_fresh_load(backend)
+
+
+def test_compaction(backend):
+    ledger.delete_transactions([2, 4], backend=backend)
+    ledger.update_transaction(5, {"Amount": 99.0}, backend=backend)
+    ledger.compact_ledger(backend)
+    assert backend.pending_changes() == 0
+    assert_matches_fresh_load(backend)
+
+
+def test_deleted_ids_are_not_reused(backend):
+    ledger.delete_transactions([40], backend=backend)
+    ledger.save_ledger(ledger.load_ledger(backend), backend=backend)
+    ledger.compact_ledger(backend)
+    added = ledger.append_transactions(rows(1, start=40), backend=backend)
+    assert added["ID"].tolist() == [41]
+
+
+@pytest.mark.parametrize("target", list(BACKENDS))
+def test_migration_continues_id_sequence(backend, target, tmp_path):
+    ledger.delete_transactions([40], backend=backend)
+    (tmp_path / "target").mkdir()
+    destination = BACKENDS[target](tmp_path / "target")
+    migrate_storage(backend, destination)
+    assert destination.next_transaction_id() == 41
+    added = ledger.append_transactions(rows(1, start=40), backend=destination)
+    assert added["ID"].tolist() == [41]
+    ledger.invalidate(destination)